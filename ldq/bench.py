@@ -0,0 +1,268 @@
+"""文曲星连点器离线基准测试
+
+用回放截图后端代替真实屏幕、用只记录坐标的记录输入后端代替真实点击，
+驱动无界面执行核心Executor跑完整的"截图-OCR-匹配-点击"循环，
+报告各场景的元素吞吐、每轮OCR调用次数与分阶段耗时，便于在CI上发现性能回退。
+不创建窗口，无桌面的Linux上可直接运行。
+
+用法：
+    python bench.py                          # 桩OCR，1/10/50个区域
+    python bench.py --screens 截图目录 --ocr paddle --loops 5
+    python bench.py --json bench_result.json # 同时输出JSON供比较
+    python bench.py --baseline bench_result.json --tolerance 0.2  # 吞吐低于基线20%以上时以非0退出
+"""
+import argparse
+import importlib.util
+import json
+import sys
+import time
+import types
+
+import numpy as np
+
+SCREEN_SIZE = (1920, 1080)  # 合成画面尺寸
+DEFAULT_SCENARIOS = "1,10,50"  # 识别区域数量
+DEFAULT_WATCH_SCENARIOS = "10"  # 另以后台停止监视开启的方式执行的识别区域数量
+REGION_SIZE = (160, 48)  # 每个识别区域的宽高
+STUB_TEXT = "确定"  # 桩OCR返回的文本，同时作为各区域的目标文本
+STOP_TEXT = "停止执行"  # 停止监视场景的停止文本，桩OCR不会返回，循环照常跑完
+
+
+# ------------------------------ 合成画面 ------------------------------
+def synthetic_frames(count=4):
+    """生成带随机色块的白底画面，帧间内容不同，使OCR结果缓存按真实比例命中/未命中"""
+    rng = np.random.default_rng(0)
+    width, height = SCREEN_SIZE
+    frames = []
+    for _ in range(count):
+        canvas = np.full((height, width, 3), 255, dtype=np.uint8)
+        for _ in range(200):
+            x, y = int(rng.integers(0, width - 40)), int(rng.integers(0, height - 20))
+            canvas[y:y + 20, x:x + 40] = rng.integers(0, 255, size=3, dtype=np.uint8)
+        frames.append(canvas)
+    return frames
+
+
+# ------------------------------ 桩OCR ------------------------------
+class StubOCRPipeline:
+    """替代PaddleX管道：不读取像素，对每张输入返回固定文本及坐标，并可模拟识别耗时"""
+
+    def __init__(self, text=STUB_TEXT, latency=0.005):
+        self.text = text
+        self.latency = latency
+        self.image_count = 0
+
+    def predict(self, inputs):
+        for image in inputs:
+            if self.latency > 0:
+                time.sleep(self.latency)
+            self.image_count += 1
+            height, width = image.shape[:2] if hasattr(image, "shape") else REGION_SIZE[::-1]
+            yield {"rec_texts": [self.text], "rec_boxes": [[2, 2, min(width, 40), min(height, 20)]],
+                   "rec_scores": [0.99]}
+
+
+def install_fake_modules(ocr_mode):
+    """在导入ldq之前，桩OCR模式下PaddleX未安装时注入占位模块"""
+    if ocr_mode == "stub" and importlib.util.find_spec("paddlex") is None:
+        paddlex = types.ModuleType("paddlex")
+
+        def create_pipeline(**kwargs):
+            raise RuntimeError("桩OCR模式下不应加载PaddleX")
+
+        paddlex.create_pipeline = create_pipeline
+        sys.modules["paddlex"] = paddlex
+
+
+# ------------------------------ 匹配自检 ------------------------------
+# (目标, OCR行, 容错配置, 是否应命中)：相似度恰为阈值时应命中；编辑距离不得把整串换掉
+FUZZY_CASES = [
+    ("abcde", "abcdx", "0.8", True),
+    ("abcdefghij", "abcdefghix", "0.9", True),
+    ("是", "否", "1", False),
+    ("是", "取消", "2", False),
+]
+
+
+def check_fuzzy_matching(ldq):
+    """容错匹配的边界自检，结果不符时中止基准测试"""
+    for target, line, tolerance, expected in FUZZY_CASES:
+        matcher = ldq.TargetMatcher(ldq.parse_targets(target))
+        found = matcher.find_fuzzy(ldq.normalize_many([line]), ldq.parse_tolerance(tolerance)) is not None
+        if found != expected:
+            raise SystemExit(f"容错匹配自检失败：目标「{target}」行「{line}」容错{tolerance}，"
+                             f"应{'命中' if expected else '不命中'}")
+
+
+# ------------------------------ 场景执行 ------------------------------
+def _merge_by_stage(ldq, stage_stats):
+    """把各作用域的同名阶段直方图合并，返回{阶段: LatencyHistogram}"""
+    merged = {}
+    with stage_stats.lock:
+        for (_, stage), histogram in stage_stats.histograms.items():
+            target = merged.setdefault(stage, ldq.LatencyHistogram())
+            target.counts = [a + b for a, b in zip(target.counts, histogram.counts)]
+            target.count += histogram.count
+            target.total += histogram.total
+            target.max = max(target.max, histogram.max)
+    return merged
+
+
+def build_workflow(ldq, args, region_count, screen_size, stop_watch=False):
+    """按网格布置region_count个识别区域与args.buttons个按钮，构造一次场景的工作流
+
+    stop_watch为True时在右下角设置停止区域与停止文本，由后台监视线程按--watch-period周期校验。
+    """
+    width, height = screen_size
+    region_w, region_h = REGION_SIZE
+    columns = max(1, width // region_w)
+    elements = []
+    for i in range(region_count):
+        x = (i % columns) * region_w
+        y = ((i // columns) * region_h) % max(region_h, height - region_h)
+        elements.append({"type": "region", "coords": (x, y, region_w, region_h), "target": STUB_TEXT})
+    for i in range(args.buttons):
+        elements.append({"type": "button", "x": (i * 50) % (width - 40), "y": height - 60})
+    stop_options = {"stop_watch_period": 0}
+    if stop_watch:
+        stop_options = {"stop_watch_period": args.watch_period, "stop_text": STOP_TEXT,
+                        "stop_coords": (width - region_w, height - region_h, region_w, region_h)}
+    return ldq.Workflow(elements, loop_count=args.loops, interval=args.interval, button_interval=args.interval,
+                        pipeline_mode=args.pipeline, ocr_worker_count=args.workers, **stop_options)
+
+
+def run_scenario(ldq, executor, args, region_count, screen, stub, stop_watch=False):
+    """在当前线程中执行一次场景，结束后汇总指标"""
+    workflow = build_workflow(ldq, args, region_count, screen.size, stop_watch)
+    images_before = stub.image_count if stub is not None else 0
+
+    start = time.perf_counter()
+    status = executor.run(workflow)
+    elapsed = time.perf_counter() - start
+    if status != "completed":
+        raise SystemExit(f"执行未正常结束：{status}")
+
+    recorder = executor.input_backend
+    element_count = args.loops * (region_count + args.buttons)
+    stages = _merge_by_stage(ldq, executor.stage_stats)
+    predict_calls = stages["predict"].count if "predict" in stages else 0
+    return {
+        "regions": region_count,
+        "buttons": args.buttons,
+        "stop_watch": stop_watch,
+        "loops": args.loops,
+        "elapsed_s": round(elapsed, 4),
+        "elements_per_s": round(element_count / elapsed, 2) if elapsed > 0 else None,
+        "ocr_calls_per_loop": round(predict_calls / args.loops, 2),
+        "ocr_images_per_loop": (round((stub.image_count - images_before) / args.loops, 2)
+                                if stub is not None else None),
+        "clicks_per_loop": round(len(recorder.events) / args.loops, 2),
+        "stages": {
+            stage: {"count": h.count, "p50_ms": round(h.percentile(0.5) * 1000, 3),
+                    "p95_ms": round(h.percentile(0.95) * 1000, 3), "p99_ms": round(h.percentile(0.99) * 1000, 3),
+                    "total_s": round(h.total, 4)}
+            for stage, h in sorted(stages.items(), key=lambda item: item[1].total, reverse=True)
+        },
+    }
+
+
+def scenario_name(result):
+    name = f"{result['regions']}个区域 / {result['buttons']}个按钮"
+    return name + (" / 停止监视" if result.get("stop_watch") else "")
+
+
+def compare_baseline(results, baseline_path, tolerance):
+    """与保存的基线JSON逐场景比较吞吐，返回低于基线超过tolerance比例的场景数"""
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = {scenario_name(r): r for r in json.load(f).get("results", [])}
+    print(f"\n与基线比较：{baseline_path}（允许下降 {tolerance * 100:.0f}%）")
+    regressions = 0
+    for result in results:
+        name = scenario_name(result)
+        base = baseline.get(name)
+        if base is None or not base.get("elements_per_s") or result["elements_per_s"] is None:
+            print(f"    [{name}] 基线中无对应数据，跳过")
+            continue
+        change = result["elements_per_s"] / base["elements_per_s"] - 1
+        regressed = change < -tolerance
+        regressions += regressed
+        print(f"    [{name}] 吞吐 {base['elements_per_s']} -> {result['elements_per_s']} 元素/秒 "
+              f"({change * 100:+.1f}%){'  性能回退' if regressed else ''}")
+    return regressions
+
+
+def print_report(ldq, executor, capture_report, results, args):
+    print(ldq.capture_summary(executor.capture_backend.name, capture_report))
+    print(executor.input_backend.summary())
+    print(f"\nOCR={args.ocr}  循环={args.loops}  间隔={args.interval}s  流水线={'是' if args.pipeline else '否'}")
+    for result in results:
+        print(f"\n[{scenario_name(result)}] 耗时 {result['elapsed_s']:.3f}s  "
+              f"吞吐 {result['elements_per_s']} 元素/秒  OCR调用 {result['ocr_calls_per_loop']} 次/轮  "
+              f"点击 {result['clicks_per_loop']} 次/轮")
+        for stage, row in result["stages"].items():
+            print(f"    {stage:<8} n={row['count']:<6} p50 {row['p50_ms']:8.2f}  p95 {row['p95_ms']:8.2f}  "
+                  f"p99 {row['p99_ms']:8.2f} ms  累计 {row['total_s']:.3f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="文曲星连点器离线基准测试（假屏幕+假输入）")
+    parser.add_argument("--screens", help="录制截图所在目录（按文件名顺序回放），缺省时使用合成画面")
+    parser.add_argument("--frame-interval", type=float, default=0.1, help="回放时每帧停留的秒数")
+    parser.add_argument("--ocr", choices=("stub", "paddle"), default="stub", help="桩OCR或真实PaddleX模型")
+    parser.add_argument("--ocr-latency", type=float, default=5.0, help="桩OCR每张图模拟的识别耗时（毫秒）")
+    parser.add_argument("--scenarios", default=DEFAULT_SCENARIOS, help="以逗号分隔的识别区域数量")
+    parser.add_argument("--buttons", type=int, default=0, help="每个场景附加的点击按钮数量")
+    parser.add_argument("--loops", type=int, default=10, help="每个场景的循环次数")
+    parser.add_argument("--interval", type=float, default=0.0, help="元素间/按钮间间隔（秒）")
+    parser.add_argument("--workers", type=int, default=0, help="OCR工作进程数（仅真实模型）")
+    parser.add_argument("--pipeline", action="store_true", help="启用流水线模式")
+    parser.add_argument("--stop-watch", default=DEFAULT_WATCH_SCENARIOS,
+                        help="以逗号分隔的识别区域数量，另以后台停止监视开启的方式执行（留空不执行）")
+    parser.add_argument("--watch-period", type=float, default=0.05, help="停止监视场景的校验周期（秒）")
+    parser.add_argument("--output", help="阶段耗时CSV等输出文件的目录（默认同ldq.py）")
+    parser.add_argument("--json", help="把结果另存为JSON文件")
+    parser.add_argument("--baseline", help="与之前--json保存的基线比较，吞吐下降超过--tolerance时以退出码1结束")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="允许的吞吐下降比例（默认0.1即10%%）")
+    args = parser.parse_args()
+    if args.ocr == "stub":
+        args.workers = 0  # 工作进程会重新导入真实PaddleX，桩OCR只在本进程内生效
+
+    install_fake_modules(args.ocr)
+    import ldq
+    check_fuzzy_matching(ldq)
+    if args.output:
+        ldq.set_output_dir(args.output)
+
+    stub = None
+    if args.ocr == "stub":
+        stub = StubOCRPipeline(latency=args.ocr_latency / 1000)
+
+    # 本机各截图后端的自测耗时仅用于报告，执行始终使用回放后端
+    capture_backends, capture_report, _ = ldq.select_capture_backend()
+    for backend in capture_backends.values():
+        backend.close()
+
+    screen = ldq.ReplayCaptureBackend(args.screens or synthetic_frames(), args.frame_interval)
+    executor = ldq.Executor(
+        capture_backend=screen,
+        input_backend=ldq.RecordingInputBackend(),
+        ocr_engine=ldq.OCREngine(pipeline_factory=(lambda **kwargs: stub) if stub is not None else None)
+    )
+    try:
+        results = [run_scenario(ldq, executor, args, int(count), screen, stub)
+                   for count in args.scenarios.split(",") if count.strip()]
+        results += [run_scenario(ldq, executor, args, int(count), screen, stub, stop_watch=True)
+                    for count in args.stop_watch.split(",") if count.strip()]
+    finally:
+        executor.close()
+    print_report(ldq, executor, capture_report, results, args)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"ocr": args.ocr, "loops": args.loops, "capture_backends": capture_report,
+                       "results": results}, f, ensure_ascii=False, indent=2)
+    if args.baseline and compare_baseline(results, args.baseline, args.tolerance):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
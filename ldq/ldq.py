@@ -1,42 +1,3072 @@
 import os
+import sys
 import time
 import json
-import pyautogui
+import argparse
+import numpy as np
+import cv2
 import tkinter as tk
-from tkinter import messagebox, simpledialog
-from PIL import ImageGrab
+from tkinter import messagebox, simpledialog, filedialog
+from PIL import Image, ImageGrab
 from paddlex import create_pipeline
-import keyboard
 import threading
-import shutil
-
-# 全局normalize函数，用于文本标准化匹配
+import hashlib
+import queue
+import multiprocessing
+import unicodedata
+import functools
+import math
+import csv
+import ctypes
+import ctypes.util
+from contextlib import contextmanager
+from multiprocessing import shared_memory
+from collections import Counter, OrderedDict, deque
+from collections.abc import Mapping
+
+# ------------------------------ 文本标准化 ------------------------------
+# 匹配前移除的标点；全角标点先按NFKC转为半角，随后一并移除
+_NORMALIZE_STRIP_CHARS = "'\"[](){},.!?:;" + "。、「」『』【】《》〈〉“”‘’…·"
+
+
+def _build_normalize_table():
+    """预编译str.translate转换表：全角/半角兼容字符按NFKC映射，指定标点删除"""
+    table = {}
+    for code in [0x3000] + list(range(0xFF01, 0xFFEF)):
+        mapped = unicodedata.normalize("NFKC", chr(code))
+        if mapped != chr(code):
+            table[code] = mapped
+    for code, mapped in list(table.items()):
+        if mapped in _NORMALIZE_STRIP_CHARS:
+            table[code] = None
+    for char in _NORMALIZE_STRIP_CHARS:
+        table[ord(char)] = None
+    return str.maketrans(table)
+
+
+_NORMALIZE_TABLE = _build_normalize_table()
+_NORMALIZE_SEPARATOR = "\x1f"  # 批量标准化时拼接各行的分隔符
+
+
+# 全局normalize函数：停止校验与点击匹配共用，保证两者判断一致
 def normalize(s):
-    # 转换数字
-    s = s.replace('０', '0').replace('１', '1').replace('２', '2').replace('３', '3').replace('４', '4')
-    s = s.replace('５', '5').replace('６', '6').replace('７', '7').replace('８', '8').replace('９', '9')
-    # 转换字母
-    s = s.replace('Ａ', 'A').replace('Ｂ', 'B').lower()
-    # 移除特殊字符（单引号、双引号、方括号等）
-    for char in ["'", '"', '[', ']', '(', ')', '{', '}', ',', '.', '!', '?', ':', ';']:
-        s = s.replace(char, '')
-    # 移除多余空白字符
-    s = ' '.join(s.split())
-    return s.strip()
-
-# 解决高DPI屏幕坐标偏移
-pyautogui.FAILSAFE = False
-
-# 固定存储路径
-output_dir = "D:\\ldq\\output"
-os.makedirs(output_dir, exist_ok=True)
-if not os.access(output_dir, os.W_OK):
-    raise PermissionError(f"输出目录无写入权限：{output_dir}")
-
-# 停止条件OCR缓存目录 - 目前已禁用缓存功能
-stop_ocr_cache_dir = os.path.join(output_dir, "stop_ocr_cache")
-# 不再自动创建缓存目录，而是在使用时才创建
-# os.makedirs(stop_ocr_cache_dir, exist_ok=True)
+    # 一次translate完成全角转换与标点移除，再转小写并合并多余空白
+    return ' '.join(s.translate(_NORMALIZE_TABLE).lower().split())
+
+
+def normalize_many(texts):
+    """批量标准化OCR文本：拼接后只做一次translate/lower，再按行拆分"""
+    if not texts:
+        return []
+    joined = _NORMALIZE_SEPARATOR.join(texts).translate(_NORMALIZE_TABLE).lower()
+    parts = joined.split(_NORMALIZE_SEPARATOR)
+    if len(parts) != len(texts):  # 文本本身含分隔符时退回逐条处理
+        return [normalize(t) for t in texts]
+    return [' '.join(part.split()) for part in parts]
+
+
+# 目标文本在一次运行中反复参与比较，缓存其标准化结果（每次运行开始时清空）
+normalize_target = functools.lru_cache(maxsize=1024)(normalize)
+
+# ------------------------------ 多目标匹配 ------------------------------
+# 目标动作别名：目标文本后以"@动作"指定，缺省为点击
+TARGET_ACTIONS = {
+    "点击": "click", "click": "click",
+    "双击": "double", "double": "double",
+    "右键": "right", "right": "right",
+    "停止": "stop", "stop": "stop",
+    "仅识别": "none", "none": "none",
+}
+TARGET_ACTION_NAMES = {"click": "点击", "double": "双击", "right": "右键", "stop": "停止", "none": "仅识别"}
+
+
+class MatchTarget:
+    """区域中的一个匹配目标：文本、匹配方式（exact精确/substring包含）与匹配后的动作"""
+
+    def __init__(self, text, mode="exact", action="click", priority=0):
+        self.text = text
+        self.norm = normalize_target(text)
+        self.mode = mode
+        self.action = action
+        self.priority = priority  # 越小越优先（配置中的先后顺序）
+
+
+def parse_targets(spec):
+    """解析目标文本配置：多个目标以"|"分隔，以"~"开头表示包含匹配，以"@动作"结尾指定动作
+
+    例如："确定|~下一步@双击|已完成@停止"。只写一个普通文本时与原先的精确匹配点击完全一致。
+    """
+    targets = []
+    for raw in spec.replace("｜", "|").split("|"):
+        raw = raw.strip()
+        mode = "exact"
+        action = "click"
+        if raw[:1] in ("~", "～"):
+            mode = "substring"
+            raw = raw[1:].strip()
+        if "@" in raw:
+            text, action_name = raw.rsplit("@", 1)
+            if action_name.strip().lower() in TARGET_ACTIONS:
+                raw = text.strip()
+                action = TARGET_ACTIONS[action_name.strip().lower()]
+        if raw:
+            targets.append(MatchTarget(raw, mode, action, len(targets)))
+    return targets
+
+
+class AhoCorasick:
+    """多模式子串匹配自动机：构建一次，对每行文本线性扫描即可找出其中出现的所有模式"""
+
+    def __init__(self, patterns):
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [[]]
+        for pattern_id, pattern in enumerate(patterns):
+            node = 0
+            for char in pattern:
+                nxt = self.goto[node].get(char)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append([])
+                    self.goto[node][char] = nxt
+                node = nxt
+            self.output[node].append(pattern_id)
+
+        # 按层次遍历建立失败指针，并把失败节点的输出合并进来
+        pending = deque(self.goto[0].values())
+        while pending:
+            node = pending.popleft()
+            for char, nxt in self.goto[node].items():
+                pending.append(nxt)
+                fallback = self.fail[node]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                target = self.goto[fallback].get(char, 0)
+                self.fail[nxt] = target if target != nxt else 0
+                self.output[nxt] = self.output[nxt] + self.output[self.fail[nxt]]
+
+    def search(self, text):
+        """返回text中出现的全部模式编号"""
+        found = set()
+        node = 0
+        for char in text:
+            while node and char not in self.goto[node]:
+                node = self.fail[node]
+            node = self.goto[node].get(char, 0)
+            if self.output[node]:
+                found.update(self.output[node])
+        return found
+
+
+def bounded_levenshtein(a, b, max_dist):
+    """带上限的编辑距离：只计算对角线附近max_dist宽的带状区域，超过上限立即返回None"""
+    if abs(len(a) - len(b)) > max_dist:
+        return None
+    if len(a) > len(b):
+        a, b = b, a
+    big = max_dist + 1
+    previous = [j if j <= max_dist else big for j in range(len(b) + 1)]
+    for i in range(1, len(a) + 1):
+        lo = max(1, i - max_dist)
+        hi = min(len(b), i + max_dist)
+        current = [big] * (len(b) + 1)
+        current[0] = i if i <= max_dist else big
+        row_min = current[0]
+        char_a = a[i - 1]
+        for j in range(lo, hi + 1):
+            cost = 0 if char_a == b[j - 1] else 1
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            current[j] = value if value <= max_dist else big
+            if current[j] < row_min:
+                row_min = current[j]
+        if row_min > max_dist:
+            return None
+        previous = current
+    return previous[len(b)] if previous[len(b)] <= max_dist else None
+
+
+def parse_tolerance(text):
+    """解析区域的容错配置：整数表示最大编辑距离，0~1之间的小数表示最低相似度，留空或0为精确匹配
+
+    不小于1的非整数（如1.5）含义不明确，抛出ValueError而不是截断为整数。
+    """
+    text = text.strip()
+    if not text:
+        return None
+    value = float(text)
+    if value <= 0:
+        return None
+    if value < 1:
+        return ("ratio", value)
+    if not value.is_integer():
+        raise ValueError(f"容错须为整数编辑距离或0~1之间的相似度：{text}")
+    return ("distance", int(value))
+
+
+class TargetMatcher:
+    """一个区域的全部目标：精确目标用字典查找，包含目标用Aho-Corasick自动机，一次扫描所有OCR行"""
+
+    def __init__(self, targets):
+        self.targets = targets
+        self.exact = {}
+        for target in targets:
+            if target.mode == "exact":
+                self.exact.setdefault(target.norm, []).append(target)
+        self.substring_targets = [t for t in targets if t.mode == "substring" and t.norm]
+        self.automaton = AhoCorasick([t.norm for t in self.substring_targets]) if self.substring_targets else None
+        # 模糊匹配的字符计数预过滤：编辑距离不超过k时，两串共有字符数至少为max(长度)-k
+        self.fuzzy_targets = [(t, Counter(t.norm)) for t in targets if t.mode == "exact" and t.norm]
+
+    def find(self, norm_lines):
+        """在已标准化的OCR行中查找目标，返回(优先级最高的目标, 行号)，未命中返回None"""
+        best = None
+        for index, line in enumerate(norm_lines):
+            candidates = list(self.exact.get(line, ()))
+            if self.automaton is not None:
+                candidates.extend(self.substring_targets[i] for i in self.automaton.search(line))
+            for target in candidates:
+                if best is None or target.priority < best[0].priority:
+                    best = (target, index)
+        return best
+
+    def template_keys(self):
+        """可用模板预筛的目标文本；含包含匹配目标时无法用模板判断，返回None"""
+        if self.substring_targets or not self.targets:
+            return None
+        return [t.norm for t in self.targets if t.norm]
+
+    def find_fuzzy(self, norm_lines, tolerance):
+        """容错匹配精确目标：返回(目标, 行号, 编辑距离, 相似度)，按目标优先级、编辑距离取最佳，未命中返回None
+
+        先按长度差和字符计数过滤候选，只有通过过滤的行才计算带上限的编辑距离。
+        """
+        kind, value = tolerance
+        best = None
+        line_counts = {}
+        for target, target_counts in self.fuzzy_targets:
+            target_len = len(target.norm)
+            for index, line in enumerate(norm_lines):
+                longest = max(target_len, len(line))
+                if not longest:
+                    continue
+                # 相似度换算为编辑距离时加微小余量，避免(1-0.8)*5=0.999…被截断为0
+                max_dist = value if kind == "distance" else math.floor((1 - value) * longest + 1e-9)
+                # 编辑距离达到目标长度即相似度为0（如"是"与"否"），不算命中
+                max_dist = min(max_dist, target_len - 1)
+                if max_dist <= 0 or abs(target_len - len(line)) > max_dist:
+                    continue
+                counts = line_counts.get(index)
+                if counts is None:
+                    counts = line_counts[index] = Counter(line)
+                if sum((counts & target_counts).values()) < longest - max_dist:
+                    continue
+                dist = bounded_levenshtein(target.norm, line, max_dist)
+                if dist is None:
+                    continue
+                if best is None or (target.priority, dist) < (best[0].priority, best[2]):
+                    best = (target, index, dist, 1 - dist / longest)
+            if best is not None and best[0] is target:
+                break  # 目标按优先级排列，较高优先级已命中即可停止
+        return best
+
+
+# ------------------------------ 模板预筛 ------------------------------
+TEMPLATE_MATCH_THRESHOLD = 0.8  # 模板匹配得分低于该值视为目标不在画面中
+TEMPLATE_MAX_ENTRIES = 256  # 模板快照条数上限，超出后淘汰最久未用的
+TEMPLATE_VERIFY_SKIPS = 10  # 同一区域连续跳过OCR达到该次数后强制OCR校验一次
+TEMPLATE_VERIFY_INTERVAL = 5.0  # 同一区域连续跳过OCR超过该时长（秒）后强制OCR校验一次
+ROI_PADDING_RATIO = 1.0  # 末次命中跟踪：命中框按文本高度的倍数向四周外扩
+ROI_MIN_PADDING = 8  # 末次命中跟踪的最小外扩像素
+
+
+class TemplatePrefilter:
+    """OpenCV模板预筛：以目标文本上次被OCR识别时的截图片段为模板，整次OCR之前先做matchTemplate
+
+    模板按(区域坐标, 标准化目标文本)存放。只有区域内全部目标都有模板、且得分都低于阈值时才判定
+    "目标不在画面中"并跳过OCR；缺少模板、包含匹配目标或模板大于区域等无法判断的情况照常OCR。
+    同一区域连续跳过达到次数或时长上限时放行一次OCR作校验，校验仍识别到目标说明模板已失效，
+    由调用方通过finish_verification/forget丢弃。
+    """
+
+    def __init__(self, threshold=TEMPLATE_MATCH_THRESHOLD, max_entries=TEMPLATE_MAX_ENTRIES,
+                 verify_skips=TEMPLATE_VERIFY_SKIPS, verify_interval=TEMPLATE_VERIFY_INTERVAL,
+                 clock=time.monotonic):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.verify_skips = verify_skips
+        self.verify_interval = verify_interval
+        self.clock = clock
+        self.templates = OrderedDict()
+        self.streaks = {}  # 区域坐标 -> (连续跳过次数, 首次跳过时间)
+        self.verifying = set()  # 已放行校验OCR、等待结果的区域坐标
+        self.lock = threading.Lock()
+        self.skips = 0
+        self.verifications = 0
+
+    def remember(self, coords, target_norm, image, bbox):
+        """从区域图像中裁出命中文本的外接框，存为该目标的灰度模板"""
+        height, width = image.shape[:2]
+        x1, y1, x2, y2 = (int(round(float(v))) for v in bbox)
+        x1, y1 = max(0, x1), max(0, y1)
+        x2, y2 = min(width, x2), min(height, y2)
+        if x2 - x1 < 4 or y2 - y1 < 4:
+            return
+        patch = cv2.cvtColor(np.ascontiguousarray(image[y1:y2, x1:x2]), cv2.COLOR_BGR2GRAY)
+        if float(patch.std()) < 1.0:
+            return  # 纯色片段无法做归一化相关匹配
+        key = (tuple(coords), target_norm)
+        with self.lock:
+            self.templates[key] = patch
+            self.templates.move_to_end(key)
+            while len(self.templates) > self.max_entries:
+                self.templates.popitem(last=False)
+
+    def absent(self, coords, target_norms, image):
+        """全部目标的模板得分都低于阈值时返回True（可跳过OCR），其余情况返回False
+
+        连续跳过达到verify_skips次或超过verify_interval秒时返回False并标记该区域待校验。
+        """
+        key = tuple(coords)
+        if not self._templates_miss(key, target_norms, image):
+            with self.lock:
+                self.streaks.pop(key, None)
+            return False
+        now = self.clock()
+        with self.lock:
+            count, since = self.streaks.get(key, (0, now))
+            if count >= self.verify_skips or now - since >= self.verify_interval:
+                self.streaks.pop(key, None)
+                self.verifying.add(key)
+                self.verifications += 1
+                return False
+            self.streaks[key] = (count + 1, since)
+            self.skips += 1
+        return True
+
+    def _templates_miss(self, key, target_norms, image):
+        if not target_norms:
+            return False
+        with self.lock:
+            patches = []
+            for target_norm in target_norms:
+                patch = self.templates.get((key, target_norm))
+                if patch is None:
+                    return False
+                patches.append(patch)
+        gray = cv2.cvtColor(np.ascontiguousarray(image), cv2.COLOR_BGR2GRAY)
+        for patch in patches:
+            if patch.shape[0] > gray.shape[0] or patch.shape[1] > gray.shape[1]:
+                return False
+            _, score, _, _ = cv2.minMaxLoc(cv2.matchTemplate(gray, patch, cv2.TM_CCOEFF_NORMED))
+            if score >= self.threshold:
+                return False
+        return True
+
+    def finish_verification(self, coords):
+        """区域的OCR结果已返回：该区域此前被放行作校验时返回True，并清除待校验标记"""
+        key = tuple(coords)
+        with self.lock:
+            if key not in self.verifying:
+                return False
+            self.verifying.discard(key)
+            return True
+
+    def forget(self, coords, target_norm):
+        with self.lock:
+            self.templates.pop((tuple(coords), target_norm), None)
+
+    def clear(self):
+        with self.lock:
+            self.templates.clear()
+            self.streaks.clear()
+            self.verifying.clear()
+            self.skips = 0
+            self.verifications = 0
+
+
+# ------------------------------ 等待目标出现 ------------------------------
+WAIT_POLL_MIN = 0.05  # 等待模式的最短轮询间隔（秒），画面变化后回到该值
+WAIT_POLL_MAX = 1.0  # 画面持续不变时轮询间隔退避的上限（秒）
+WAIT_BACKOFF = 1.6  # 画面未变化时轮询间隔的放大倍数
+PIXEL_CHANGE_THRESHOLD = 2.0  # 缩略灰度图平均像素差超过该值视为画面变化
+
+
+def pixels_changed(previous, current, threshold=PIXEL_CHANGE_THRESHOLD):
+    """比较两张区域截图（BGR）：尺寸不同或缩略灰度图的平均差值超过阈值时视为画面变化"""
+    if previous is None or previous.shape != current.shape:
+        return True
+    height, width = current.shape[:2]
+    scale = min(1.0, 64.0 / max(height, width))
+    size = (max(1, int(width * scale)), max(1, int(height * scale)))
+    a = cv2.resize(cv2.cvtColor(np.ascontiguousarray(previous), cv2.COLOR_BGR2GRAY), size,
+                   interpolation=cv2.INTER_AREA)
+    b = cv2.resize(cv2.cvtColor(np.ascontiguousarray(current), cv2.COLOR_BGR2GRAY), size,
+                   interpolation=cv2.INTER_AREA)
+    return float(cv2.absdiff(a, b).mean()) > threshold
+
+
+# ------------------------------ 阶段耗时统计 ------------------------------
+STAGE_HIST_MIN = 1e-5  # 直方图最小桶上界（秒）
+STAGE_HIST_RATIO = 1.1  # 相邻桶上界之比，分位数误差不超过一个桶宽（约10%）
+STAGE_HIST_BUCKETS = 200  # 覆盖约10微秒到30分钟
+STAGE_PANEL_ROWS = 8  # 主窗口阶段耗时面板显示的行数（按累计耗时排序）
+
+
+class LatencyHistogram:
+    """对数分桶的耗时直方图：内存固定，可随时读取p50/p95/p99"""
+
+    def __init__(self):
+        self.counts = [0] * STAGE_HIST_BUCKETS
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        if seconds <= STAGE_HIST_MIN:
+            index = 0
+        else:
+            index = min(STAGE_HIST_BUCKETS - 1, int(math.log(seconds / STAGE_HIST_MIN, STAGE_HIST_RATIO)) + 1)
+        self.counts[index] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def percentile(self, q):
+        """返回分位数所在桶的上界（不超过实测最大值）"""
+        if not self.count:
+            return 0.0
+        rank = max(1, math.ceil(q * self.count))
+        cumulative = 0
+        for index, bucket_count in enumerate(self.counts):
+            cumulative += bucket_count
+            if cumulative >= rank:
+                return min(STAGE_HIST_MIN * STAGE_HIST_RATIO ** index, self.max)
+        return self.max
+
+
+class StageStats:
+    """按(作用域, 阶段)汇总耗时直方图，作用域为具体区域/按钮或停止校验等"""
+
+    def __init__(self):
+        self.histograms = {}
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def timer(self, scope, stage):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(scope, stage, time.perf_counter() - started)
+
+    def record(self, scope, stage, seconds):
+        with self.lock:
+            histogram = self.histograms.get((scope, stage))
+            if histogram is None:
+                histogram = self.histograms[(scope, stage)] = LatencyHistogram()
+            histogram.add(seconds)
+
+    def rows(self):
+        """[(作用域, 阶段, 次数, 累计秒, p50, p95, p99, 最大)]，按累计耗时降序"""
+        with self.lock:
+            rows = [(scope, stage, h.count, h.total, h.percentile(0.5), h.percentile(0.95),
+                     h.percentile(0.99), h.max) for (scope, stage), h in self.histograms.items()]
+        rows.sort(key=lambda row: row[3], reverse=True)
+        return rows
+
+    def summary(self, limit=STAGE_PANEL_ROWS):
+        rows = self.rows()
+        if not rows:
+            return "阶段耗时：暂无数据"
+        lines = [f"{scope:<8} {stage:<6} n={count:<5} p50 {p50 * 1000:7.1f}  p95 {p95 * 1000:7.1f}  "
+                 f"p99 {p99 * 1000:7.1f}  max {peak * 1000:7.1f} ms  累计 {total:6.2f} s"
+                 for scope, stage, count, total, p50, p95, p99, peak in rows[:limit]]
+        return "\n".join(lines)
+
+    def export_csv(self, path):
+        with open(path, "w", newline="", encoding="utf-8-sig") as f:
+            writer = csv.writer(f)
+            writer.writerow(["作用域", "阶段", "次数", "累计(秒)", "p50(毫秒)", "p95(毫秒)", "p99(毫秒)", "最大(毫秒)"])
+            for scope, stage, count, total, p50, p95, p99, peak in self.rows():
+                writer.writerow([scope, stage, count, f"{total:.4f}", f"{p50 * 1000:.2f}", f"{p95 * 1000:.2f}",
+                                 f"{p99 * 1000:.2f}", f"{peak * 1000:.2f}"])
+
+    def clear(self):
+        with self.lock:
+            self.histograms.clear()
+
+
+# ------------------------------ 截止时间调度 ------------------------------
+# 落后于计划时的处理策略：追赶=保持原时间网格、连续执行直到追上；
+# 压缩=保持网格，但每个间隔最多压缩到SCHEDULE_COMPRESS_RATIO；跳过=丢弃已错过的时间，从实际开始时间重新计时
+SCHEDULE_POLICIES = {"追赶": "catchup", "压缩": "compress", "跳过": "skip"}
+SCHEDULE_COMPRESS_RATIO = 0.5
+SCHEDULE_STATS_WINDOW = 500  # 迟滞统计保留的最近样本数
+
+
+class DeadlineScheduler:
+    """基于单调时钟的截止时间调度：元素按绝对开始时间执行，间隔从计划开始时间起算，
+
+    OCR和点击的耗时不会叠加到间隔上，节奏不随运行时间漂移。记录每个元素的迟滞（实际开始-计划开始）。
+    """
+
+    def __init__(self, policy="compress", sleep=time.sleep):
+        self.policy = policy
+        self.sleep = sleep
+        self.grid = None  # 时间网格上当前元素的开始时间（追赶/压缩策略据此追上计划）
+        self.planned = None  # 当前元素的计划开始时间
+        self.actual = None  # 当前元素的实际开始时间
+        self.next_start = None
+        self.lateness = deque(maxlen=SCHEDULE_STATS_WINDOW)
+
+    def wait(self):
+        """等待到下一个元素的计划开始时间，返回迟滞秒数"""
+        now = time.monotonic()
+        if self.next_start is None:
+            self.next_start = self.grid = now
+        if now < self.next_start:
+            self.sleep(self.next_start - now)
+            now = time.monotonic()
+        self.planned = self.next_start
+        self.actual = now
+        late = max(0.0, now - self.planned)
+        self.lateness.append(late)
+        return late
+
+    def advance(self, period):
+        """当前元素结束后，按其间隔排定下一个元素的计划开始时间"""
+        if self.planned is None:
+            return
+        if self.policy == "skip":
+            self.grid = self.actual + period
+        else:
+            self.grid += period
+        self.next_start = self.grid
+        if self.policy == "compress":
+            self.next_start = max(self.grid, self.actual + period * SCHEDULE_COMPRESS_RATIO)
+
+    def reset(self):
+        """暂停恢复后重新计时，暂停期间不计入迟滞"""
+        self.next_start = None
+
+    def summary(self):
+        if not self.lateness:
+            return "调度迟滞：暂无数据"
+        samples = sorted(self.lateness)
+        mean = sum(samples) / len(samples)
+        jitter = (sum((v - mean) ** 2 for v in samples) / len(samples)) ** 0.5
+        p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+        return (f"调度迟滞 平均{mean * 1000:.1f}ms / P95 {p95 * 1000:.1f}ms / 最大{samples[-1] * 1000:.1f}ms"
+                f"，抖动{jitter * 1000:.1f}ms")
+
+
+# ------------------------------ 图片元素匹配 ------------------------------
+IMAGE_MATCH_THRESHOLD = 0.8  # 图片元素默认匹配阈值（TM_CCOEFF_NORMED得分）
+IMAGE_MATCH_SCALES = (1.0, 0.9, 1.1, 0.8, 1.25)  # 多尺度搜索的缩放比例，应对界面缩放
+ELEMENT_TYPE_NAMES = {"region": "识别区域", "button": "点击按钮", "image": "图片元素"}
+
+
+def locate_template(screen, template, scales=IMAGE_MATCH_SCALES):
+    """多尺度金字塔模板匹配：先在缩小一半的金字塔层上粗搜，再在原分辨率下对粗搜位置附近精修
+
+    screen与template均为灰度数组。返回(得分, (x1, y1, x2, y2), 缩放比例)，所有尺度都放不下时返回None。
+    """
+    screen_small = cv2.pyrDown(screen)
+    best = None
+    for scale in scales:
+        if scale == 1.0:
+            scaled = template
+        else:
+            interpolation = cv2.INTER_AREA if scale < 1.0 else cv2.INTER_LINEAR
+            scaled = cv2.resize(template, None, fx=scale, fy=scale, interpolation=interpolation)
+        th, tw = scaled.shape[:2]
+        if th < 4 or tw < 4 or th > screen.shape[0] or tw > screen.shape[1]:
+            continue
+
+        if min(th, tw) >= 16:
+            # 粗搜：金字塔上一层，计算量约为原分辨率的1/16
+            coarse = cv2.matchTemplate(screen_small, cv2.pyrDown(scaled), cv2.TM_CCOEFF_NORMED)
+            _, _, _, (cx, cy) = cv2.minMaxLoc(coarse)
+            x0, y0 = max(0, cx * 2 - 4), max(0, cy * 2 - 4)
+            window = screen[y0:y0 + th + 8, x0:x0 + tw + 8]
+        else:
+            # 模板过小时金字塔层丢失细节，直接在原分辨率搜索
+            x0, y0 = 0, 0
+            window = screen
+        if window.shape[0] < th or window.shape[1] < tw:
+            continue
+        _, score, _, (x, y) = cv2.minMaxLoc(cv2.matchTemplate(window, scaled, cv2.TM_CCOEFF_NORMED))
+        if best is None or score > best[0]:
+            best = (score, (x0 + x, y0 + y, x0 + x + tw, y0 + y + th), scale)
+    return best
+
+
+# 截图转数组：PaddleX可直接接收BGR格式的ndarray，无需落盘PNG
+def pil_to_bgr_array(img):
+    arr = np.asarray(img.convert("RGB"))
+    return np.ascontiguousarray(arr[:, :, ::-1])
+
+# ------------------------------ 截图后端 ------------------------------
+CAPTURE_BENCH_ROUNDS = 5  # 启动自测时每个后端计时的截图次数（取中位数）
+CAPTURE_BENCH_BBOX = (0, 0, 800, 600)  # 启动自测的截图范围
+CAPTURE_IMAGE_SUFFIXES = (".png", ".jpg", ".jpeg", ".bmp")  # 回放后端读取的截图格式
+
+
+class CaptureBackend:
+    """截图后端接口：grab(bbox)返回BGR格式的ndarray，bbox为(x1, y1, x2, y2)，None表示主屏全屏"""
+
+    name = ""
+
+    def grab(self, bbox=None):
+        raise NotImplementedError
+
+    def release_thread(self):
+        """释放当前线程独占的截图资源，截图所在线程结束前调用"""
+        pass
+
+    def close(self):
+        pass
+
+
+class ImageGrabCaptureBackend(CaptureBackend):
+    """PIL.ImageGrab：各平台均可用，但每次截图都要经过PIL图像转换"""
+
+    name = "ImageGrab"
+
+    def grab(self, bbox=None):
+        return pil_to_bgr_array(ImageGrab.grab(bbox=bbox))
+
+
+class MSSCaptureBackend(CaptureBackend):
+    """mss（可选依赖）：直接返回BGRA像素缓冲区；mss实例不可跨线程共用，每个线程各建一个
+
+    Windows下每个实例占用一个DC和位图，线程结束时须经release_thread关闭，避免GDI句柄累积。
+    """
+
+    name = "mss"
+
+    def __init__(self):
+        import mss
+        self._mss = mss
+        self._local = threading.local()
+        self._instances = []
+        self._lock = threading.Lock()
+        self._primary = self._sct().monitors[1]
+
+    def _sct(self):
+        sct = getattr(self._local, "sct", None)
+        if sct is None:
+            sct = self._mss.mss()
+            self._local.sct = sct
+            with self._lock:
+                self._instances.append(sct)
+        return sct
+
+    def grab(self, bbox=None):
+        if bbox is None:
+            monitor = self._primary
+        else:
+            x1, y1, x2, y2 = bbox
+            monitor = {"left": x1, "top": y1, "width": x2 - x1, "height": y2 - y1}
+        return cv2.cvtColor(np.asarray(self._sct().grab(monitor)), cv2.COLOR_BGRA2BGR)
+
+    def release_thread(self):
+        sct = getattr(self._local, "sct", None)
+        if sct is None:
+            return
+        self._local.sct = None
+        with self._lock:
+            if sct in self._instances:
+                self._instances.remove(sct)
+        try:
+            sct.close()
+        except Exception:
+            pass
+
+    def close(self):
+        with self._lock:
+            instances, self._instances = self._instances, []
+        for sct in instances:
+            try:
+                sct.close()
+            except Exception:
+                pass
+
+
+class _XImage(ctypes.Structure):
+    """XImage结构体的前半部分（只读写到bits_per_pixel为止）"""
+    _fields_ = [
+        ("width", ctypes.c_int), ("height", ctypes.c_int), ("xoffset", ctypes.c_int), ("format", ctypes.c_int),
+        ("data", ctypes.c_void_p), ("byte_order", ctypes.c_int), ("bitmap_unit", ctypes.c_int),
+        ("bitmap_bit_order", ctypes.c_int), ("bitmap_pad", ctypes.c_int), ("depth", ctypes.c_int),
+        ("bytes_per_line", ctypes.c_int), ("bits_per_pixel", ctypes.c_int),
+    ]
+
+
+class _XShmSegmentInfo(ctypes.Structure):
+    _fields_ = [("shmseg", ctypes.c_ulong), ("shmid", ctypes.c_int), ("shmaddr", ctypes.c_void_p),
+                ("readOnly", ctypes.c_int)]
+
+
+_XErrorHandler = ctypes.CFUNCTYPE(ctypes.c_int, ctypes.c_void_p, ctypes.c_void_p)
+
+
+class XShmCaptureBackend(CaptureBackend):
+    """Linux下经X11共享内存（MIT-SHM）截取整屏再裁剪，像素不经X连接传输
+
+    X服务器不在本机或不支持共享内存时构造失败，由自动选择跳过。
+    """
+
+    name = "XShm"
+    ZPIXMAP = 2
+    ALL_PLANES = 0xFFFFFFFF
+    IPC_PRIVATE, IPC_CREAT, IPC_RMID = 0, 0o1000, 0
+
+    def __init__(self):
+        if not sys.platform.startswith("linux"):
+            raise RuntimeError("XShm仅支持Linux")
+        libs = {name: ctypes.util.find_library(name) for name in ("X11", "Xext", "c")}
+        if not all(libs.values()):
+            raise RuntimeError("未找到libX11/libXext")
+        xlib, xext, libc = (ctypes.CDLL(libs[name]) for name in ("X11", "Xext", "c"))
+        self._declare(xlib, xext, libc)
+        self._xlib, self._xext, self._libc = xlib, xext, libc
+        self._lock = threading.Lock()
+        self._display = None
+        self._image = None
+        self._shm = _XShmSegmentInfo()  # XImage内部保存其指针，须与XImage同生命周期
+        self._attached = False
+
+        display = xlib.XOpenDisplay(None)
+        if not display:
+            raise RuntimeError("无法连接X显示")
+        self._display = display
+        try:
+            if not xext.XShmQueryExtension(display):
+                raise RuntimeError("X服务器不支持MIT-SHM")
+            screen = xlib.XDefaultScreen(display)
+            self._root = xlib.XRootWindow(display, screen)
+            self.width = xlib.XDisplayWidth(display, screen)
+            self.height = xlib.XDisplayHeight(display, screen)
+            image = xext.XShmCreateImage(display, xlib.XDefaultVisual(display, screen),
+                                         xlib.XDefaultDepth(display, screen), self.ZPIXMAP, None,
+                                         ctypes.byref(self._shm), self.width, self.height)
+            if not image:
+                raise RuntimeError("XShmCreateImage失败")
+            self._image = image
+            if image.contents.bits_per_pixel != 32:
+                raise RuntimeError(f"不支持的像素位数：{image.contents.bits_per_pixel}")
+
+            size = image.contents.bytes_per_line * self.height
+            self._shm.shmid = libc.shmget(self.IPC_PRIVATE, size, self.IPC_CREAT | 0o600)
+            if self._shm.shmid < 0:
+                raise RuntimeError("shmget失败")
+            address = libc.shmat(self._shm.shmid, None, 0)
+            if address in (None, ctypes.c_void_p(-1).value):
+                libc.shmctl(self._shm.shmid, self.IPC_RMID, None)
+                raise RuntimeError("shmat失败")
+            self._shm.shmaddr = image.contents.data = address
+            self._shm.readOnly = 0
+
+            # 远程X服务器上XShmAttach会异步报错，临时接管错误处理以免Xlib默认处理直接退出进程
+            errors = []
+            handler = _XErrorHandler(lambda _display, _event: errors.append(1) or 0)
+            previous = xlib.XSetErrorHandler(handler)
+            attached = xext.XShmAttach(display, ctypes.byref(self._shm))
+            xlib.XSync(display, 0)
+            xlib.XSetErrorHandler(ctypes.c_void_p(previous))
+            # X服务器已完成attach，标记删除：所有进程分离后由内核回收，进程异常退出也不会残留
+            libc.shmctl(self._shm.shmid, self.IPC_RMID, None)
+            if not attached or errors:
+                raise RuntimeError("XShmAttach失败（X服务器可能不在本机）")
+            self._attached = True
+
+            buffer = (ctypes.c_ubyte * size).from_address(address)
+            self._pixels = np.ctypeslib.as_array(buffer).reshape(self.height, -1)[
+                :, :self.width * 4].reshape(self.height, self.width, 4)
+        except Exception:
+            self.close()
+            raise
+
+    @staticmethod
+    def _declare(xlib, xext, libc):
+        c_void_p, c_int, c_uint, c_ulong = ctypes.c_void_p, ctypes.c_int, ctypes.c_uint, ctypes.c_ulong
+        xlib.XOpenDisplay.argtypes, xlib.XOpenDisplay.restype = [ctypes.c_char_p], c_void_p
+        for func in ("XDefaultScreen",):
+            getattr(xlib, func).argtypes = [c_void_p]
+        for func in ("XDisplayWidth", "XDisplayHeight", "XDefaultDepth"):
+            getattr(xlib, func).argtypes = [c_void_p, c_int]
+        xlib.XRootWindow.argtypes, xlib.XRootWindow.restype = [c_void_p, c_int], c_ulong
+        xlib.XDefaultVisual.argtypes, xlib.XDefaultVisual.restype = [c_void_p, c_int], c_void_p
+        xlib.XSync.argtypes = [c_void_p, c_int]
+        xlib.XCloseDisplay.argtypes = [c_void_p]
+        xlib.XSetErrorHandler.restype = c_void_p
+        xlib.XDestroyImage.argtypes = [ctypes.POINTER(_XImage)]
+        xext.XShmQueryExtension.argtypes = [c_void_p]
+        xext.XShmCreateImage.argtypes = [c_void_p, c_void_p, c_uint, c_int, c_void_p,
+                                         ctypes.POINTER(_XShmSegmentInfo), c_uint, c_uint]
+        xext.XShmCreateImage.restype = ctypes.POINTER(_XImage)
+        xext.XShmAttach.argtypes = [c_void_p, ctypes.POINTER(_XShmSegmentInfo)]
+        xext.XShmDetach.argtypes = [c_void_p, ctypes.POINTER(_XShmSegmentInfo)]
+        xext.XShmGetImage.argtypes = [c_void_p, c_ulong, ctypes.POINTER(_XImage), c_int, c_int, c_ulong]
+        libc.shmget.argtypes, libc.shmget.restype = [c_int, ctypes.c_size_t, c_int], c_int
+        libc.shmat.argtypes, libc.shmat.restype = [c_int, c_void_p, c_int], c_void_p
+        libc.shmdt.argtypes = [c_void_p]
+        libc.shmctl.argtypes = [c_int, c_int, c_void_p]
+
+    def grab(self, bbox=None):
+        x1, y1, x2, y2 = bbox if bbox is not None else (0, 0, self.width, self.height)
+        x1, y1 = max(0, x1), max(0, y1)
+        x2, y2 = min(self.width, x2), min(self.height, y2)
+        with self._lock:
+            if not self._attached:
+                raise RuntimeError("XShm截图后端已关闭")
+            if not self._xext.XShmGetImage(self._display, self._root, self._image, 0, 0, self.ALL_PLANES):
+                raise RuntimeError("XShmGetImage失败")
+            # 共享内存会被下一次截图覆盖，转换时复制出独立的BGR数组
+            return cv2.cvtColor(self._pixels[y1:y2, x1:x2], cv2.COLOR_BGRA2BGR)
+
+    def close(self):
+        with self._lock:
+            if self._attached:
+                self._xext.XShmDetach(self._display, ctypes.byref(self._shm))
+                self._xlib.XSync(self._display, 0)
+                self._attached = False
+            if self._shm.shmaddr:
+                self._libc.shmdt(ctypes.c_void_p(self._shm.shmaddr))
+                self._shm.shmaddr = None
+            if self._image:
+                # 像素缓冲区是共享内存，不能交给XDestroyImage释放
+                self._image.contents.data = None
+                self._xlib.XDestroyImage(self._image)
+                self._image = None
+            if self._display:
+                self._xlib.XCloseDisplay(self._display)
+                self._display = None
+
+
+class ReplayCaptureBackend(CaptureBackend):
+    """回放后端：按固定周期轮流返回目录中的截图（或给定的帧），用于测试与离线基准，不参与自动选择"""
+
+    name = "回放"
+
+    def __init__(self, source, frame_interval=0.1):
+        if isinstance(source, str):
+            paths = sorted(os.path.join(source, f) for f in os.listdir(source)
+                           if f.lower().endswith(CAPTURE_IMAGE_SUFFIXES))
+            if not paths:
+                raise ValueError(f"截图目录中没有图片：{source}")
+            source = [Image.open(path) for path in paths]
+        self.frames = [pil_to_bgr_array(frame) if isinstance(frame, Image.Image) else np.ascontiguousarray(frame)
+                       for frame in source]
+        if not self.frames:
+            raise ValueError("回放后端至少需要一帧")
+        self.frame_interval = frame_interval
+        self.started = time.monotonic()
+
+    @property
+    def size(self):
+        height, width = self.frames[0].shape[:2]
+        return width, height
+
+    def grab(self, bbox=None):
+        index = 0
+        if self.frame_interval > 0:
+            index = int((time.monotonic() - self.started) / self.frame_interval) % len(self.frames)
+        frame = self.frames[index]
+        if bbox is None:
+            return frame.copy()
+        x1, y1, x2, y2 = bbox
+        return frame[y1:y2, x1:x2].copy()
+
+
+# 参与启动自测的后端，按优先顺序排列（耗时相同时取靠前者）
+CAPTURE_BACKEND_TYPES = (XShmCaptureBackend, MSSCaptureBackend, ImageGrabCaptureBackend)
+
+
+def benchmark_capture_backend(backend, rounds=CAPTURE_BENCH_ROUNDS, bbox=CAPTURE_BENCH_BBOX):
+    """预热一次后连续截图rounds次，返回单次截图耗时的中位数（秒）"""
+    backend.grab(bbox)
+    samples = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        backend.grab(bbox)
+        samples.append(time.perf_counter() - start)
+    return sorted(samples)[len(samples) // 2]
+
+
+def select_capture_backend(backend_types=CAPTURE_BACKEND_TYPES):
+    """构造并自测各截图后端，返回({名称: 后端}, {名称: 耗时秒数或不可用原因}, 最快后端名称)"""
+    backends, report = {}, {}
+    for backend_type in backend_types:
+        try:
+            backend = backend_type()
+        except Exception as err:
+            report[backend_type.name] = f"不可用（{type(err).__name__}: {str(err)}）"
+            continue
+        try:
+            report[backend_type.name] = benchmark_capture_backend(backend)
+            backends[backend_type.name] = backend
+        except Exception as err:
+            backend.close()
+            report[backend_type.name] = f"截图失败（{type(err).__name__}: {str(err)}）"
+    best = min(backends, key=lambda name: report[name]) if backends else None
+    return backends, report, best
+
+
+def capture_summary(active, report):
+    """状态栏文本：当前后端及各后端的自测耗时"""
+    parts = [f"{name} {value * 1000:.1f}ms" if isinstance(value, float) else f"{name} 不可用"
+             for name, value in report.items()]
+    return f"截图后端 {active}（{'，'.join(parts)}）" if parts else f"截图后端 {active}"
+
+
+# ------------------------------ 输入后端 ------------------------------
+INPUT_ACTIONS = ("click", "double", "right")  # 输入后端支持的点击动作
+
+
+class InputBackend:
+    """输入后端接口：click(x, y, action)在屏幕坐标处单击/双击/右键，返回时事件已提交给系统
+
+    每次点击后只按action_delay显式等待（默认0），不再有pyautogui.PAUSE那样的隐式0.1秒暂停；
+    点击本身（不含等待）的耗时计入latency直方图。sleep可替换为可中断的等待。
+    """
+
+    name = ""
+
+    def __init__(self, action_delay=0.0, sleep=time.sleep):
+        self.action_delay = action_delay
+        self.sleep = sleep
+        self.latency = LatencyHistogram()
+
+    def click(self, x, y, action="click"):
+        if action not in INPUT_ACTIONS:
+            raise ValueError(f"不支持的点击动作：{action}")
+        start = time.perf_counter()
+        self._send(int(x), int(y), action)
+        self.latency.add(time.perf_counter() - start)
+        if self.action_delay > 0:
+            self.sleep(self.action_delay)
+
+    def _send(self, x, y, action):
+        raise NotImplementedError
+
+    def reset_stats(self):
+        self.latency = LatencyHistogram()
+
+    def summary(self):
+        latency = self.latency
+        text = f"输入后端 {self.name}"
+        if latency.count:
+            text += (f"：点击 {latency.count} 次，p50 {latency.percentile(0.5) * 1000:.2f}ms / "
+                     f"p99 {latency.percentile(0.99) * 1000:.2f}ms")
+        return text + f"，点击后延迟 {self.action_delay * 1000:.0f}ms"
+
+    def close(self):
+        pass
+
+
+class _MouseInput(ctypes.Structure):
+    _fields_ = [("dx", ctypes.c_int32), ("dy", ctypes.c_int32), ("mouseData", ctypes.c_uint32),
+                ("dwFlags", ctypes.c_uint32), ("time", ctypes.c_uint32), ("dwExtraInfo", ctypes.c_size_t)]
+
+
+class _Input(ctypes.Structure):
+    """Win32 INPUT结构体（联合体中MOUSEINPUT最大，只声明该成员即可保证大小一致）"""
+    _fields_ = [("type", ctypes.c_uint32), ("mi", _MouseInput)]
+
+
+class SendInputBackend(InputBackend):
+    """Windows：SetCursorPos定位后用一次SendInput提交全部按下/抬起事件"""
+
+    name = "SendInput"
+    INPUT_MOUSE = 0
+    FLAGS = {"click": (0x0002, 0x0004), "double": (0x0002, 0x0004, 0x0002, 0x0004), "right": (0x0008, 0x0010)}
+
+    def __init__(self, action_delay=0.0, sleep=time.sleep):
+        if sys.platform != "win32":
+            raise RuntimeError("SendInput仅支持Windows")
+        super().__init__(action_delay, sleep)
+        self._user32 = ctypes.windll.user32
+        self._user32.SetCursorPos.argtypes = [ctypes.c_int, ctypes.c_int]
+        self._user32.SendInput.argtypes = [ctypes.c_uint, ctypes.POINTER(_Input), ctypes.c_int]
+        self._user32.SendInput.restype = ctypes.c_uint
+        # 预先构造各动作的事件数组，点击时只需一次系统调用
+        self._events = {}
+        for action, flags in self.FLAGS.items():
+            events = (_Input * len(flags))()
+            for event, flag in zip(events, flags):
+                event.type = self.INPUT_MOUSE
+                event.mi.dwFlags = flag
+            self._events[action] = events
+
+    def _send(self, x, y, action):
+        if not self._user32.SetCursorPos(x, y):
+            raise ctypes.WinError()
+        events = self._events[action]
+        if self._user32.SendInput(len(events), events, ctypes.sizeof(_Input)) != len(events):
+            raise ctypes.WinError()
+
+
+class XTestInputBackend(InputBackend):
+    """Linux：经XTest扩展注入鼠标事件，XSync返回即表示X服务器已处理"""
+
+    name = "XTest"
+    BUTTONS = {"click": (1, 1), "double": (1, 2), "right": (3, 1)}  # 动作 -> (按键, 次数)
+
+    def __init__(self, action_delay=0.0, sleep=time.sleep):
+        if not sys.platform.startswith("linux"):
+            raise RuntimeError("XTest仅支持Linux")
+        libs = {name: ctypes.util.find_library(name) for name in ("X11", "Xtst")}
+        if not all(libs.values()):
+            raise RuntimeError("未找到libX11/libXtst")
+        super().__init__(action_delay, sleep)
+        xlib, xtst = ctypes.CDLL(libs["X11"]), ctypes.CDLL(libs["Xtst"])
+        xlib.XOpenDisplay.argtypes, xlib.XOpenDisplay.restype = [ctypes.c_char_p], ctypes.c_void_p
+        xlib.XSync.argtypes = [ctypes.c_void_p, ctypes.c_int]
+        xlib.XCloseDisplay.argtypes = [ctypes.c_void_p]
+        xtst.XTestQueryExtension.argtypes = [ctypes.c_void_p] + [ctypes.POINTER(ctypes.c_int)] * 4
+        xtst.XTestFakeMotionEvent.argtypes = [ctypes.c_void_p, ctypes.c_int, ctypes.c_int, ctypes.c_int,
+                                              ctypes.c_ulong]
+        xtst.XTestFakeButtonEvent.argtypes = [ctypes.c_void_p, ctypes.c_uint, ctypes.c_int, ctypes.c_ulong]
+        self._xlib, self._xtst = xlib, xtst
+        self._lock = threading.Lock()
+        self._display = xlib.XOpenDisplay(None)
+        if not self._display:
+            raise RuntimeError("无法连接X显示")
+        ints = [ctypes.c_int() for _ in range(4)]
+        if not xtst.XTestQueryExtension(self._display, *(ctypes.byref(i) for i in ints)):
+            self.close()
+            raise RuntimeError("X服务器不支持XTest")
+
+    def _send(self, x, y, action):
+        button, times = self.BUTTONS[action]
+        with self._lock:
+            if not self._display:
+                raise RuntimeError("XTest输入后端已关闭")
+            self._xtst.XTestFakeMotionEvent(self._display, -1, x, y, 0)
+            for _ in range(times):
+                self._xtst.XTestFakeButtonEvent(self._display, button, 1, 0)
+                self._xtst.XTestFakeButtonEvent(self._display, button, 0, 0)
+            self._xlib.XSync(self._display, 0)
+
+    def close(self):
+        with self._lock:
+            if self._display:
+                self._xlib.XCloseDisplay(self._display)
+                self._display = None
+
+
+class PyAutoGUIInputBackend(InputBackend):
+    """pyautogui：各平台通用的后备实现，调用时传_pause=False跳过其隐式暂停"""
+
+    name = "pyautogui"
+
+    def __init__(self, action_delay=0.0, sleep=time.sleep):
+        import pyautogui
+        super().__init__(action_delay, sleep)
+        # 解决高DPI屏幕坐标偏移
+        pyautogui.FAILSAFE = False
+        self._calls = {"click": pyautogui.click, "double": pyautogui.doubleClick, "right": pyautogui.rightClick}
+
+    def _send(self, x, y, action):
+        self._calls[action](x, y, _pause=False)
+
+
+class RecordingInputBackend(InputBackend):
+    """记录后端：不操作鼠标，只记录(动作, x, y, 时间)，用于测试与离线基准，不参与自动选择"""
+
+    name = "记录"
+
+    def __init__(self, action_delay=0.0, sleep=time.sleep):
+        super().__init__(action_delay, sleep)
+        self.events = []
+        self._lock = threading.Lock()
+
+    def _send(self, x, y, action):
+        with self._lock:
+            self.events.append((action, x, y, time.perf_counter()))
+
+    def reset_stats(self):
+        super().reset_stats()
+        with self._lock:
+            self.events = []
+
+
+def enable_dpi_awareness():
+    """声明进程感知DPI，使截图、点击与界面使用同一套物理像素坐标
+
+    以前由导入pyautogui顺带完成；改用SendInput后pyautogui不再导入，需在创建Tk窗口前显式声明。
+    """
+    if sys.platform != "win32":
+        return
+    try:
+        ctypes.windll.shcore.SetProcessDpiAwareness(2)  # 按显示器感知DPI（Win8.1+）
+    except Exception:
+        try:
+            ctypes.windll.user32.SetProcessDPIAware()
+        except Exception:
+            pass
+
+
+# 自动选择时依次尝试的输入后端：优先系统原生接口，pyautogui兜底
+INPUT_BACKEND_TYPES = (SendInputBackend, XTestInputBackend, PyAutoGUIInputBackend)
+
+
+def create_input_backend(action_delay=0.0, sleep=time.sleep, backend_types=INPUT_BACKEND_TYPES):
+    """返回第一个可用的输入后端；全部不可用时抛出最后一个错误"""
+    last_error = RuntimeError("没有可用的输入后端")
+    for backend_type in backend_types:
+        try:
+            return backend_type(action_delay, sleep)
+        except Exception as err:
+            last_error = err
+    raise last_error
+
+
+# ------------------------------ 帧采集 ------------------------------
+class ScreenFrame:
+    """一次截屏得到的整帧（BGR数组），按屏幕坐标裁剪出零拷贝视图"""
+
+    def __init__(self, array, origin, timestamp):
+        self.array = array
+        self.origin = origin  # 帧左上角的屏幕坐标
+        self.timestamp = timestamp  # time.monotonic()时间戳
+
+    def contains(self, coords):
+        x1, y1, w, h = coords
+        ox, oy = self.origin
+        fh, fw = self.array.shape[:2]
+        return x1 >= ox and y1 >= oy and x1 + w <= ox + fw and y1 + h <= oy + fh
+
+    def crop(self, coords):
+        x1, y1, w, h = coords
+        ox, oy = self.origin
+        return self.array[y1 - oy:y1 - oy + h, x1 - ox:x1 - ox + w]
+
+
+class ScreenObservation:
+    """一次屏幕观测：持有截屏帧，并按区域（current_id或"stop"）记录该帧的OCR结果
+
+    在新鲜度窗口内，停止校验与区域识别共用同一份帧和识别结果；
+    窗口过期或点击操作改变画面（invalidate）后需要重新观测。
+    """
+
+    def __init__(self, frame, max_age):
+        self.frame = frame
+        self.created = frame.timestamp if frame is not None else time.monotonic()
+        self.max_age = max_age  # 秒
+        self._results = {}
+        self._lock = threading.Lock()
+        self._invalidated = False
+
+    def is_fresh(self):
+        return not self._invalidated and time.monotonic() - self.created <= self.max_age
+
+    def invalidate(self):
+        self._invalidated = True
+
+    def get(self, key):
+        with self._lock:
+            return self._results.get(key)
+
+    def put(self, key, result):
+        with self._lock:
+            self._results[key] = result
+
+
+def union_bbox(coords_list):
+    """计算多个(x1, y1, w, h)区域的外接矩形，返回截图后端使用的(x1, y1, x2, y2)"""
+    x1 = min(c[0] for c in coords_list)
+    y1 = min(c[1] for c in coords_list)
+    x2 = max(c[0] + c[2] for c in coords_list)
+    y2 = max(c[1] + c[3] for c in coords_list)
+    return x1, y1, x2, y2
+
+
+def grab_frame(backend, coords_list=None):
+    """用指定截图后端截取所有区域的外接矩形（未指定区域时截取全屏）"""
+    bbox = union_bbox(coords_list) if coords_list else None
+    timestamp = time.monotonic()
+    array = backend.grab(bbox)
+    origin = (bbox[0], bbox[1]) if bbox else (0, 0)
+    return ScreenFrame(array, origin, timestamp)
+
+
+# ------------------------------ OCR结果内存解析 ------------------------------
+def _parse_texts(value):
+    """文本字段取值转为非空文本列表"""
+    if isinstance(value, list):
+        return [str(t).strip() for t in value if str(t).strip()]
+    if isinstance(value, str):
+        return [value.strip()] if value.strip() else []
+    return []
+
+
+def _parse_boxes(value):
+    """坐标字段取值中筛出格式为[x1, y1, x2, y2]的坐标"""
+    if not isinstance(value, list):
+        return []
+    return [b for b in value
+            if isinstance(b, list) and len(b) == 4 and all(isinstance(num, (int, float)) for num in b)]
+
+
+def compile_field_path(field_path):
+    """把点分隔的字段路径编译为访问函数；部分PaddleX版本将字段包裹在"res"下，访问时一并查找"""
+    keys = tuple(field_path.split('.'))
+
+    def access(data):
+        for root in (data, data.get("res")):
+            current = root
+            for key in keys:
+                if isinstance(current, Mapping) and key in current:
+                    current = current[key]
+                else:
+                    current = None
+                    break
+            if current is not None:
+                return current.tolist() if hasattr(current, "tolist") else current
+        return None
+
+    return access
+
+
+class OCRFieldSchema:
+    """一次运行内的OCR字段配置：候选路径在运行开始时编译为访问函数
+
+    首个带有该字段的结果确定当前PaddleX版本实际输出的路径，之后只读该路径；
+    该路径取不到值时再依次尝试其余候选并重新确定。on_detect(类别, 路径)在确定路径时回调。
+    """
+
+    def __init__(self, text_fields, bbox_fields, score_fields=("rec_scores", "scores"), on_detect=None):
+        self.candidates = {
+            "text": [(path, compile_field_path(path)) for path in text_fields],
+            "bbox": [(path, compile_field_path(path)) for path in bbox_fields],
+            "score": [(path, compile_field_path(path)) for path in score_fields],
+        }
+        self.detected = {"text": None, "bbox": None}  # 类别 -> (路径, 访问函数)
+        self.on_detect = on_detect
+
+    def _value(self, kind, result):
+        detected = self.detected[kind]
+        if detected is not None:
+            value = detected[1](result.data)
+            if value is not None:
+                return value
+        for path, access in self.candidates[kind]:
+            value = access(result.data)
+            if value is not None:
+                if detected is None or detected[0] != path:
+                    self.detected[kind] = (path, access)
+                    if self.on_detect is not None:
+                        self.on_detect(kind, path)
+                return value
+        return None
+
+    def texts(self, result):
+        value = self._value("text", result)
+        return [] if value is None else _parse_texts(value)
+
+    def boxes(self, result):
+        value = self._value("bbox", result)
+        return [] if value is None else _parse_boxes(value)
+
+    def compiled_fields(self):
+        """缓存/工作进程精简结果时需保留的字段：全部候选文本/坐标字段及置信度，返回[(路径, 访问函数)]"""
+        return self.candidates["text"] + self.candidates["bbox"] + self.candidates["score"]
+
+    def field_paths(self):
+        return [path for path, _ in self.compiled_fields()]
+
+
+class OCRResult:
+    """PaddleX结果对象的字典视图，文本/坐标经OCRFieldSchema直接读取，替代save_to_json后再读回文件"""
+
+    def __init__(self, raw):
+        self.raw = raw
+        data = raw
+        if not isinstance(data, Mapping):
+            # 非dict结果对象：退回到其json属性
+            data = getattr(raw, "json", None)
+            if callable(data):
+                data = data()
+        self.data = data if isinstance(data, Mapping) else {}
+
+    def compact(self, schema):
+        """只保留schema中各字段的普通Python数据，去掉结果对象中的图像等大块数据，便于缓存"""
+        data = {}
+        for field, access in schema.compiled_fields():
+            value = access(self.data)
+            if value is None:
+                continue
+            keys = field.split('.')
+            node = data
+            for key in keys[:-1]:
+                node = node.setdefault(key, {})
+            node[keys[-1]] = value
+        return OCRResult(data)
+
+
+# ------------------------------ OCR结果缓存 ------------------------------
+# 缓存上限（条目数/估算内存）
+OCR_CACHE_MAX_ENTRIES = 256
+OCR_CACHE_MAX_BYTES = 16 * 1024 * 1024
+
+
+def _estimate_size(value):
+    """粗略估算缓存值占用的内存字节数"""
+    if isinstance(value, str):
+        return 50 + len(value) * 4
+    if isinstance(value, Mapping):
+        return 240 + sum(_estimate_size(k) + _estimate_size(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return 56 + 8 * len(value) + sum(_estimate_size(v) for v in value)
+    return 32
+
+
+class OCRResultCache:
+    """按区域像素内容哈希缓存OCR结果，限制条目数与内存占用，超限时按LRU淘汰"""
+
+    def __init__(self, max_entries=OCR_CACHE_MAX_ENTRIES, max_bytes=OCR_CACHE_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> (OCRResult, 估算字节数)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(image):
+        """区域尺寸 + 像素内容哈希"""
+        digest = hashlib.blake2b(np.ascontiguousarray(image).data, digest_size=16).hexdigest()
+        return image.shape, digest
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, result):
+        size = _estimate_size(result.data)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._entries[key] = (result, size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self.hits = 0
+            self.misses = 0
+
+    def summary(self):
+        total = self.hits + self.misses
+        hit_rate = self.hits / total * 100 if total else 0.0
+        return (f"OCR缓存：命中 {self.hits} / 未命中 {self.misses}（命中率 {hit_rate:.1f}%）"
+                f" | 条目 {len(self._entries)} | 约 {self._bytes // 1024} KB")
+
+
+# 输出目录（截图、调试结果与阶段耗时），可用--output指定；首次写入时才创建
+DEFAULT_OUTPUT_DIR = ("D:\\ldq\\output" if sys.platform == "win32"
+                      else os.path.join(os.path.expanduser("~"), ".ldq", "output"))
+output_dir = DEFAULT_OUTPUT_DIR
+STOP_BASE_IMAGE = "stop_condition_base.png"  # 停止区域基准截图
+# 调试模式下各OCR批次落盘的PNG/JSON文件名前缀（对应_predict_batch的file_prefix）
+DEBUG_FILE_PREFIXES = ("region_current_", "stop_check_", "region_roi_")
+
+
+def set_output_dir(path):
+    global output_dir
+    output_dir = os.path.abspath(path)
+
+
+def ensure_output_dir():
+    """创建输出目录（已存在时直接使用），无写入权限时抛出PermissionError；返回目录路径"""
+    os.makedirs(output_dir, exist_ok=True)
+    if not os.access(output_dir, os.W_OK):
+        raise PermissionError(f"输出目录无写入权限：{output_dir}")
+    return output_dir
+
+
+# ------------------------------ OCR引擎 ------------------------------
+class OCREngine:
+    """进程内常驻的OCR引擎，识别区域与停止区域共用同一个PaddleX管道
+
+    模型在首次使用时加载且只加载一次；predict调用加锁串行执行；
+    仅当调用失败且健康检查不通过时才重新加载。
+    pipeline_factory用于替换PaddleX的create_pipeline（如基准测试中的桩OCR）。
+    """
+
+    def __init__(self, pipeline_name="OCR", pipeline_factory=None):
+        self.pipeline_name = pipeline_name
+        self.pipeline_factory = pipeline_factory or create_pipeline
+        self._pipeline = None
+        self._lock = threading.RLock()
+        self.load_count = 0  # 实际加载模型的次数
+
+    def load(self):
+        with self._lock:
+            if self._pipeline is None:
+                pipeline = self.pipeline_factory(pipeline=self.pipeline_name)
+                # 额外的有效性检查，确保pipeline确实被成功创建且可调用
+                if pipeline is None or not hasattr(pipeline, 'predict'):
+                    raise Exception("OCR管道创建失败：pipeline为None或缺少predict方法")
+                self._pipeline = pipeline
+                self.load_count += 1
+            return self._pipeline
+
+    @property
+    def is_loaded(self):
+        return self._pipeline is not None
+
+    def health_check(self):
+        """用一张空白小图试跑识别，确认管道仍可用"""
+        with self._lock:
+            if self._pipeline is None or not callable(getattr(self._pipeline, 'predict', None)):
+                return False
+            try:
+                list(self._pipeline.predict([np.full((32, 32, 3), 255, dtype=np.uint8)]))
+                return True
+            except Exception:
+                return False
+
+    def reload(self):
+        with self._lock:
+            self.release()
+            return self.load()
+
+    def release(self):
+        with self._lock:
+            self._pipeline = None
+
+    def predict(self, inputs):
+        with self._lock:
+            pipeline = self.load()
+            try:
+                return list(pipeline.predict(inputs))
+            except Exception as err:
+                # 识别失败时检查管道状态，只有管道已损坏才重新加载
+                if not self.health_check():
+                    try:
+                        self.reload()
+                    except Exception as reload_err:
+                        print(f"OCR引擎重新加载失败：{type(reload_err).__name__}: {str(reload_err)}")
+                raise err
+
+
+# ------------------------------ 多进程OCR工作池 ------------------------------
+def _ocr_worker_main(task_queue, result_queue):
+    """OCR工作进程：持有独立的PaddleX管道，从共享内存读取区域图像，识别后回传精简结果"""
+    try:
+        pipeline = create_pipeline(pipeline="OCR")
+    except Exception as err:
+        result_queue.put(("error", None, f"{type(err).__name__}: {str(err)}"))
+        return
+    result_queue.put(("ready", None, os.getpid()))
+
+    shm = None
+    schema = None  # 按父进程传来的字段路径编译，路径不变时复用
+    while True:
+        task = task_queue.get()
+        if task is None:
+            break
+        task_id, source, field_paths = task
+        if schema is None or schema.field_paths() != list(field_paths):
+            # 精简结果只需逐个字段读取，全部路径按文本候选编译即可
+            schema = OCRFieldSchema(field_paths, (), score_fields=())
+        try:
+            if isinstance(source, str):
+                image = source
+            else:
+                shm_name, offset, shape, dtype = source
+                # 父进程扩容时会换用新的共享内存块，此时重新挂载
+                if shm is None or shm.name != shm_name:
+                    if shm is not None:
+                        shm.close()
+                    shm = shared_memory.SharedMemory(name=shm_name)
+                image = np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=offset).copy()
+            output = list(pipeline.predict([image]))
+            data = OCRResult(output[0]).compact(schema).data if output else None
+            result_queue.put(("result", task_id, data))
+        except Exception as err:
+            result_queue.put(("failed", task_id, f"{type(err).__name__}: {str(err)}"))
+
+    if shm is not None:
+        shm.close()
+
+
+class OCRWorkerPool:
+    """多进程OCR工作池：N个工作进程各自持有PaddleX管道，区域图像经共享内存传递
+
+    结果按完成顺序乱序返回，再按任务序号重新排列，与OCREngine.predict的返回顺序一致。
+    """
+
+    def __init__(self, worker_count, cpu_threads):
+        self.worker_count = worker_count
+        self.cpu_threads = cpu_threads
+        self._processes = []
+        self._task_queue = None
+        self._result_queue = None
+        self._shm = None
+        self._lock = threading.Lock()
+        self._next_task_id = 0
+
+    @property
+    def is_alive(self):
+        return bool(self._processes) and all(p.is_alive() for p in self._processes)
+
+    def start(self, timeout=300):
+        """启动工作进程并等待全部模型加载完成"""
+        ctx = multiprocessing.get_context("spawn")
+        self._task_queue = ctx.Queue()
+        self._result_queue = ctx.Queue()
+
+        # 子进程在启动时继承环境变量，借此限制每个进程的CPU线程数
+        thread_vars = ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS")
+        saved_env = {var: os.environ.get(var) for var in thread_vars}
+        try:
+            for var in thread_vars:
+                os.environ[var] = str(self.cpu_threads)
+            for _ in range(self.worker_count):
+                process = ctx.Process(target=_ocr_worker_main,
+                                      args=(self._task_queue, self._result_queue), daemon=True)
+                process.start()
+                self._processes.append(process)
+        finally:
+            for var, value in saved_env.items():
+                if value is None:
+                    os.environ.pop(var, None)
+                else:
+                    os.environ[var] = value
+
+        ready = 0
+        deadline = time.monotonic() + timeout
+        while ready < self.worker_count:
+            try:
+                kind, _, payload = self._result_queue.get(timeout=max(0.1, deadline - time.monotonic()))
+            except queue.Empty:
+                self.shutdown()
+                raise Exception("OCR工作进程加载模型超时")
+            if kind == "error":
+                self.shutdown()
+                raise Exception(f"OCR工作进程加载失败：{payload}")
+            ready += 1
+
+    def _ensure_buffer(self, size):
+        if self._shm is None or self._shm.size < size:
+            self._release_buffer()
+            self._shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+
+    def _release_buffer(self):
+        if self._shm is not None:
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
+
+    def predict(self, inputs, field_paths, timeout=120):
+        with self._lock:
+            arrays = [np.ascontiguousarray(item) for item in inputs if not isinstance(item, str)]
+            self._ensure_buffer(sum(a.nbytes for a in arrays))
+
+            # 把所有区域图像依次写入共享内存，任务中只传偏移和形状
+            offset = 0
+            pending = {}
+            for index, item in enumerate(inputs):
+                if isinstance(item, str):
+                    source = item
+                else:
+                    item = np.ascontiguousarray(item)
+                    view = np.ndarray(item.shape, dtype=item.dtype, buffer=self._shm.buf, offset=offset)
+                    view[...] = item
+                    source = (self._shm.name, offset, item.shape, item.dtype.str)
+                    offset += item.nbytes
+                task_id = self._next_task_id
+                self._next_task_id += 1
+                pending[task_id] = index
+                self._task_queue.put((task_id, source, list(field_paths)))
+
+            # 乱序收集结果，按任务序号放回原位置
+            output = [None] * len(inputs)
+            errors = []
+            deadline = time.monotonic() + timeout
+            while pending:
+                try:
+                    kind, task_id, payload = self._result_queue.get(timeout=max(0.1, deadline - time.monotonic()))
+                except queue.Empty:
+                    raise Exception("OCR工作进程响应超时")
+                if task_id not in pending:
+                    continue
+                index = pending.pop(task_id)
+                if kind == "failed":
+                    errors.append(payload)
+                else:
+                    output[index] = payload if payload is not None else {}
+            if errors:
+                raise Exception(f"OCR工作进程识别失败：{errors[0]}")
+            return output
+
+    def shutdown(self):
+        for _ in self._processes:
+            try:
+                self._task_queue.put(None)
+            except Exception:
+                pass
+        for process in self._processes:
+            process.join(timeout=2)
+            if process.is_alive():
+                process.terminate()
+        self._processes = []
+        self._release_buffer()
+
+
+# ------------------------------ 异步停止条件监视 ------------------------------
+class RunControl:
+    """执行状态控制：运行/暂停/停止由同一个Condition管理
+
+    状态变化时唤醒所有等待者，执行线程的休眠与暂停等待都可被立即打断；
+    暂停期间阻塞在Condition上，不再轮询，不占用CPU。
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._running = False
+        self._paused = False
+        self._interrupted = False
+
+    @property
+    def running(self):
+        return self._running
+
+    @property
+    def paused(self):
+        return self._paused
+
+    def _set(self, running, paused):
+        with self._condition:
+            self._running = running
+            self._paused = paused
+            self._condition.notify_all()
+
+    def start(self):
+        self._set(True, False)
+
+    def pause(self):
+        self._set(False, True)
+
+    def resume(self):
+        self._set(True, False)
+
+    def stop(self):
+        self._set(False, False)
+
+    def interrupt(self):
+        """打断当前休眠但不改变状态（如后台检测到停止条件，交由执行线程处理）"""
+        with self._condition:
+            self._interrupted = True
+            self._condition.notify_all()
+
+    def sleep(self, seconds):
+        """可打断的休眠：暂停、停止或interrupt()时立即返回；返回True表示睡满且仍在运行"""
+        deadline = time.monotonic() + seconds
+        with self._condition:
+            self._interrupted = False
+            while self._running and not self._interrupted:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return True
+                self._condition.wait(remaining)
+            self._interrupted = False
+        return False
+
+    def wait_while_paused(self):
+        """暂停时阻塞直到恢复或停止；返回True表示可以继续运行"""
+        with self._condition:
+            while self._paused:
+                self._condition.wait()
+            return self._running
+
+
+class StopWatcher:
+    """后台线程按固定周期评估停止条件，满足时置位triggered事件
+
+    执行线程在元素之间只需检查事件，点击流程不再等待停止区域OCR；
+    acknowledge()记录从检测到停止条件到执行线程实际终止之间的延迟。
+    """
+
+    def __init__(self, check_fn, period, should_check=None, on_trigger=None, on_exit=None):
+        self.check_fn = check_fn  # 返回True表示满足停止条件
+        self.period = period  # 秒
+        self.should_check = should_check or (lambda: True)
+        self.on_trigger = on_trigger  # 满足停止条件时回调，用于立即唤醒执行线程
+        self.on_exit = on_exit  # 监视线程结束前在该线程内回调，用于释放线程独占的资源
+        self.triggered = threading.Event()
+        self.detected_at = None
+        self.halt_latency = None
+        self.check_count = 0
+        self._halt = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._halt.clear()
+        self.triggered.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._halt.set()
+
+    def _run(self):
+        try:
+            self._watch()
+        finally:
+            if self.on_exit is not None:
+                self.on_exit()
+
+    def _watch(self):
+        while not self._halt.is_set():
+            started = time.monotonic()
+            if self.should_check():
+                try:
+                    self.check_count += 1
+                    # 校验期间可能已暂停：再次确认仍需校验才置位，避免恢复运行后被误停
+                    if self.check_fn() and self.should_check():
+                        self.detected_at = time.monotonic()
+                        self.triggered.set()
+                        if self.on_trigger is not None:
+                            self.on_trigger()
+                        return
+                except Exception as err:
+                    print(f"停止条件监视出错：{type(err).__name__}: {str(err)}")
+            self._halt.wait(max(0.0, self.period - (time.monotonic() - started)))
+
+    def acknowledge(self):
+        """执行线程响应停止信号时调用，返回检测到终止的延迟（秒）"""
+        if self.detected_at is not None and self.halt_latency is None:
+            self.halt_latency = time.monotonic() - self.detected_at
+        return self.halt_latency
+
+
+# ------------------------------ 工作流配置 ------------------------------
+# OCR结果中文本/坐标字段的默认查找路径（界面留空时使用）
+DEFAULT_TEXT_FIELDS = ("rec_texts", "text", "words", "content", "result.text")
+DEFAULT_BBOX_FIELDS = ("rec_boxes", "bbox", "boxes", "coordinates", "position", "locations",
+                       "bounding_box", "rect", "result.bbox", "regions.bbox")
+
+
+class Workflow:
+    """一次执行的完整配置：元素、循环与间隔、停止条件及识别参数
+
+    只含普通数据，不依赖界面：可由窗口收集，也可从JSON文件加载后在命令行中执行。
+    elements按执行顺序排列，每项为字典（"id"可选，仅用于状态输出）：
+        识别区域 {"type": "region", "coords": [x, y, w, h], "target": "确定|~下一步@双击", "tolerance": "", "wait": 0}
+        图片元素 {"type": "image", "coords": [x, y, w, h], "template": 灰度数组或图片路径, "threshold": 0.8}
+        点击按钮 {"type": "button", "x": 100, "y": 200, "width": 40, "height": 30}
+    时间类参数的单位均为秒。
+    """
+
+    FIELDS = ("loop_count", "interval", "button_interval", "click_delay", "schedule_policy", "pipeline_mode",
+              "x_offset", "y_offset", "stop_coords", "stop_text", "text_fields", "bbox_fields", "ocr_batch_size",
+              "observation_max_age", "stop_watch_period", "ocr_worker_count", "ocr_worker_threads",
+              "template_prefilter", "debug_ocr_files")
+
+    # 取值校验：字段 -> (是否合法, 出错提示)
+    CHECKS = {
+        "loop_count": (lambda v: v >= 1, "请输入有效的循环次数（正整数）"),
+        "interval": (lambda v: v >= 0, "请输入有效的元素间间隔（非负数）"),
+        "button_interval": (lambda v: v >= 0, "请输入有效的按钮间间隔（非负数）"),
+        "click_delay": (lambda v: v >= 0, "请输入有效的点击后延迟（非负数）"),
+        "ocr_batch_size": (lambda v: v >= 1, "请输入有效的OCR批大小（正整数）"),
+        "observation_max_age": (lambda v: v >= 0, "请输入有效的识别结果有效期（非负数）"),
+        "stop_watch_period": (lambda v: v >= 0, "请输入有效的停止检测周期（非负数；0为同步校验）"),
+        "ocr_worker_count": (lambda v: v >= 0, "请输入有效的OCR进程数（非负整数）"),
+        "ocr_worker_threads": (lambda v: v >= 1, "请输入有效的每进程线程数（正整数）"),
+    }
+
+    def __init__(self, elements=(), loop_count=1, interval=1.0, button_interval=1.0, click_delay=0.0,
+                 schedule_policy="compress", pipeline_mode=False, x_offset=0, y_offset=0,
+                 stop_coords=None, stop_text="", text_fields=DEFAULT_TEXT_FIELDS, bbox_fields=DEFAULT_BBOX_FIELDS,
+                 ocr_batch_size=8, observation_max_age=0.5, stop_watch_period=0.25,
+                 ocr_worker_count=0, ocr_worker_threads=2, template_prefilter=False, debug_ocr_files=False):
+        self.elements = list(elements)
+        self.loop_count = loop_count
+        self.interval = interval  # 识别区域/图片元素之间的间隔
+        self.button_interval = button_interval  # 按钮之间的间隔
+        self.click_delay = click_delay  # 每次点击后显式等待的时间
+        self.schedule_policy = schedule_policy  # 落后于计划时的策略，见SCHEDULE_POLICIES
+        self.pipeline_mode = pipeline_mode
+        self.x_offset = x_offset  # 按钮点击坐标微调
+        self.y_offset = y_offset
+        self.stop_coords = tuple(stop_coords) if stop_coords else None  # 停止区域(x1, y1, w, h)
+        self.stop_text = stop_text
+        self.text_fields = list(text_fields)
+        self.bbox_fields = list(bbox_fields)
+        self.ocr_batch_size = ocr_batch_size
+        self.observation_max_age = observation_max_age
+        self.stop_watch_period = stop_watch_period  # 0表示在执行线程中同步校验
+        self.ocr_worker_count = ocr_worker_count  # 0表示在本进程内识别
+        self.ocr_worker_threads = ocr_worker_threads
+        self.template_prefilter = template_prefilter
+        self.debug_ocr_files = debug_ocr_files
+
+    def validate(self):
+        """检查各参数取值，不合法时抛出ValueError（提示可直接展示给用户）"""
+        for field, (is_valid, message) in self.CHECKS.items():
+            try:
+                valid = is_valid(getattr(self, field))
+            except TypeError:  # JSON中写成了字符串等非数值
+                valid = False
+            if not valid:
+                raise ValueError(message)
+        if self.schedule_policy not in SCHEDULE_POLICIES.values():
+            raise ValueError(f"未知的调度策略：{self.schedule_policy}")
+        for index, spec in enumerate(self.elements, 1):
+            if spec.get("type") not in ELEMENT_TYPE_NAMES:
+                raise ValueError(f"第{index}个元素的类型无效：{spec.get('type')}")
+            if spec["type"] == "button" and not all(key in spec for key in ("x", "y")):
+                raise ValueError(f"第{index}个元素（点击按钮）缺少坐标x/y")
+            if spec["type"] == "region":
+                try:
+                    parse_tolerance(str(spec.get("tolerance", "") or ""))
+                except ValueError:
+                    raise ValueError(f"第{index}个元素（识别区域）的容错须为整数编辑距离或0~1之间的相似度")
+
+    @classmethod
+    def from_dict(cls, data, base_dir="."):
+        """由JSON字典构造；图片元素的模板路径相对于base_dir解析并读取为灰度数组"""
+        unknown = set(data) - set(cls.FIELDS) - {"elements"}
+        if unknown:
+            raise ValueError(f"未知的配置项：{', '.join(sorted(unknown))}")
+        schedule_policy = data.get("schedule_policy", "compress")
+        kwargs = {field: data[field] for field in cls.FIELDS if field in data}
+        kwargs["schedule_policy"] = SCHEDULE_POLICIES.get(schedule_policy, schedule_policy)
+        elements = []
+        for spec in data.get("elements", []):
+            spec = dict(spec)
+            if spec.get("type") == "image" and isinstance(spec.get("template"), str):
+                path = os.path.join(base_dir, spec["template"])
+                spec["template"] = np.asarray(Image.open(path).convert("L"))
+            elements.append(spec)
+        return cls(elements, **kwargs)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "r", encoding="utf-8") as f:
+            return cls.from_dict(json.load(f), os.path.dirname(os.path.abspath(path)))
+
+    def save(self, path):
+        """保存为JSON；图片元素的模板另存为同目录下的PNG并以相对路径引用"""
+        stem = os.path.splitext(os.path.basename(path))[0]
+        elements = []
+        for index, spec in enumerate(self.elements, 1):
+            spec = dict(spec)
+            if spec.get("type") == "image" and spec.get("template") is not None \
+                    and not isinstance(spec["template"], str):
+                template_name = f"{stem}_image{spec.get('id', index)}.png"
+                Image.fromarray(spec["template"]).save(os.path.join(os.path.dirname(os.path.abspath(path)),
+                                                                    template_name))
+                spec["template"] = template_name
+            if spec.get("coords") is not None:
+                spec["coords"] = list(spec["coords"])
+            elements.append(spec)
+        data = {field: getattr(self, field) for field in self.FIELDS}
+        data["stop_coords"] = list(self.stop_coords) if self.stop_coords else None
+        data["elements"] = elements
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+
+
+# ------------------------------ 执行核心 ------------------------------
+class ExecutionReporter:
+    """执行过程的输出接口（在执行线程中调用），默认不输出
+
+    status为全局状态，element_status为某个元素的状态，perf为性能状态栏中的一项，
+    finished在一次执行结束后调用，status取值为"completed"、"stopped"或"error"。
+    """
+
+    def status(self, text):
+        pass
+
+    def element_status(self, elem, text):
+        pass
+
+    def perf(self, key, text):
+        pass
+
+    def finished(self, status):
+        pass
+
+
+class ConsoleReporter(ExecutionReporter):
+    """命令行输出：状态逐行打印（与上一行相同时不重复打印），性能信息在执行结束时汇总打印"""
+
+    def __init__(self, verbose=True):
+        self.verbose = verbose
+        self.perf_notes = {}
+        self._last_line = None
+
+    def _print(self, line):
+        if line != self._last_line:
+            self._last_line = line
+            print(f"{time.strftime('%H:%M:%S')} {line}", flush=True)
+
+    def status(self, text):
+        self._print(text)
+
+    def element_status(self, elem, text):
+        if self.verbose:
+            self._print(f"[{ELEMENT_TYPE_NAMES[elem['type']]}{elem['data']['current_id']}] {text}")
+
+    def perf(self, key, text):
+        self.perf_notes[key] = text
+
+    def finished(self, status):
+        for text in list(self.perf_notes.values()):
+            print(text)
+
+
+class Executor:
+    """与界面无关的执行核心：按Workflow依次截图、识别、匹配并点击
+
+    OCR引擎、截图/输入后端、OCR结果缓存与模板快照在多次执行之间常驻；
+    run()在当前线程中阻塞执行，start()在后台线程中执行并立即返回。
+    暂停/恢复/停止经由run_control，所有输出经由reporter。
+    """
+
+    def __init__(self, reporter=None, capture_backend=None, input_backend=None, ocr_engine=None):
+        self.reporter = reporter or ExecutionReporter()
+        self.run_control = RunControl()  # 运行/暂停/停止状态，状态变化立即唤醒执行线程
+        self.stage_stats = StageStats()  # 各区域/按钮热路径的分阶段耗时
+        self.ocr_cache = OCRResultCache()  # 区域与停止区域共用的OCR结果缓存
+        self.template_prefilter = TemplatePrefilter()  # 模板快照只在本次运行内有效，运行开始时清空
+        # OCR引擎：识别区域与停止区域共用，进程内只加载一次
+        self.ocr_engine = ocr_engine or OCREngine()
+        self.ocr_pool = None
+
+        # 截图后端：未指定时自测各可用后端，默认使用最快的一个
+        if capture_backend is None:
+            self.capture_backends, self.capture_report, self.capture_best = select_capture_backend()
+            capture_backend = self.capture_backends.get(self.capture_best) or ImageGrabCaptureBackend()
+        else:
+            self.capture_backends, self.capture_report, self.capture_best = \
+                {capture_backend.name: capture_backend}, {}, capture_backend.name
+        self.capture_backend = capture_backend
+        # 输入后端：优先系统原生接口，点击后只有显式配置的延迟，等待可被暂停/停止打断
+        self.input_backend = input_backend or create_input_backend()
+        self.input_backend.sleep = self.run_control.sleep
+
+        self.workflow = Workflow()
+        self.elements = []  # 本次执行的元素（由workflow.elements转换而来，附带跟踪状态）
+        self.field_schema = OCRFieldSchema(DEFAULT_TEXT_FIELDS, DEFAULT_BBOX_FIELDS)
+        self.observation = None  # 当前屏幕观测（帧 + 各区域OCR结果）
+        self.screen_changes = 0  # 点击等改变画面的操作次数，流水线据此判断预取结果是否仍然可信
+        self._observation_lock = threading.Lock()
+        self.stop_watcher = None
+        self.roi_stats = {"attempts": 0, "hits": 0}  # 末次命中跟踪的尝试/命中次数
+        self._matchers = {}  # 目标配置 -> TargetMatcher，每次运行开始时清空
+        self.last_status = None
+        self._stop_text_warned = False  # 本次运行是否已提示未输入停止文本
+
+    # ------------------------------ 执行状态 ------------------------------
+    @property
+    def is_running(self):
+        return self.run_control.running
+
+    @property
+    def is_paused(self):
+        return self.run_control.paused
+
+    def _should_halt(self):
+        """已停止/暂停，或后台监视已检测到停止条件（等待中的元素应尽快让出执行线程）"""
+        return not self.is_running or (self.stop_watcher is not None and self.stop_watcher.triggered.is_set())
+
+    def _scope(self, elem):
+        """阶段耗时统计中元素的作用域名称"""
+        return f"{ELEMENT_TYPE_NAMES[elem['type']]}{elem['data']['current_id']}"
+
+    def _update_perf_status(self, key, text):
+        self.reporter.perf(key, text)
+
+    # ------------------------------ 后端管理 ------------------------------
+    def set_capture_backend(self, backend):
+        """更换截图后端，之后的截图立即改用新后端（回放后端等外部构造的后端也由此注入）"""
+        self.capture_backend = backend
+        self.observation = None
+        self._update_perf_status("capture", capture_summary(backend.name, self.capture_report))
+
+    def set_input_backend(self, backend):
+        """更换输入后端（不在运行中调用），记录后端等外部构造的后端由此注入"""
+        self.input_backend.close()
+        backend.sleep = self.run_control.sleep
+        self.input_backend = backend
+        self._update_perf_status("input", backend.summary())
+
+    def close(self):
+        """释放OCR引擎、工作进程与截图/输入后端"""
+        self.ocr_engine.release()
+        if self.ocr_pool is not None:
+            self.ocr_pool.shutdown()
+            self.ocr_pool = None
+        for backend in self.capture_backends.values():
+            backend.close()
+        if self.capture_backend not in self.capture_backends.values():
+            self.capture_backend.close()
+        self.input_backend.close()
+
+    # ------------------------------ 执行流程 ------------------------------
+    @staticmethod
+    def _runtime_element(index, spec):
+        """把配置中的元素转换为执行期的元素字典（附带本次执行的跟踪状态）"""
+        data = {"current_id": spec.get("id", index + 1)}
+        if spec["type"] == "region":
+            data.update({
+                "coords": tuple(spec["coords"]) if spec.get("coords") else None,
+                "target_text": str(spec.get("target", "")).strip(),
+                "tolerance": str(spec.get("tolerance", "") or ""),
+                "wait": spec.get("wait", 0),
+                "wait_stats": {"times": [], "timeouts": 0},  # 等待模式下目标出现耗时统计
+                "last_hit": None  # 上次命中的文本框（区域内坐标），供末次命中跟踪使用
+            })
+        elif spec["type"] == "image":
+            data.update({
+                "coords": tuple(spec["coords"]) if spec.get("coords") else None,
+                "template": spec.get("template"),
+                "threshold": spec.get("threshold", IMAGE_MATCH_THRESHOLD)
+            })
+        else:
+            data.update({"x": spec["x"], "y": spec["y"],
+                         "width": spec.get("width", 40), "height": spec.get("height", 30)})
+        return {"type": spec["type"], "data": data}
+
+    def prepare(self, workflow):
+        """校验配置、重置本次运行的状态并进入运行状态；配置或OCR引擎有误时抛出异常"""
+        if self.is_running:
+            raise RuntimeError("已有任务在运行中")
+        workflow.validate()
+        self.workflow = workflow
+        self.elements = [self._runtime_element(i, spec) for i, spec in enumerate(workflow.elements)]
+        # OCR引擎常驻，已加载时不会重复加载模型；只有按钮的工作流无需OCR
+        if workflow.stop_text or any(e["type"] == "region" for e in self.elements):
+            self.ocr_engine.load()
+
+        # 字段配置可能已变化，每次运行前重新编译字段并清空OCR结果缓存
+        self.field_schema = self.build_field_schema()
+        self.ocr_cache.clear()
+        normalize_target.cache_clear()
+        self._matchers = {}
+        self.template_prefilter.clear()
+        self.roi_stats = {"attempts": 0, "hits": 0}
+        self.stage_stats.clear()
+        self.input_backend.action_delay = workflow.click_delay
+        self.input_backend.reset_stats()
+        self.observation = None
+        self.last_status = None
+        self._stop_text_warned = False
+
+        self.run_control.start()
+        self.reporter.status(f"开始执行，总循环次数：{workflow.loop_count}")
+
+    def run(self, workflow):
+        """在当前线程中执行一次工作流，返回结束状态"""
+        self.prepare(workflow)
+        return self._execute()
+
+    def start(self, workflow):
+        """在后台线程中执行一次工作流，返回该线程（准备阶段的异常在调用线程中抛出）"""
+        self.prepare(workflow)
+        thread = threading.Thread(target=self._execute, daemon=True)
+        thread.start()
+        return thread
+
+    def _stop_condition_met(self, observation=None):
+        """后台监视模式下只读取事件；同步模式下当场执行停止校验"""
+        watcher = self.stop_watcher
+        if watcher is None:
+            return self.check_stop_condition(observation)
+        if not watcher.triggered.is_set():
+            return False
+        latency = watcher.acknowledge()
+        self._update_perf_status("halt", f"停止检测→终止延迟 {latency * 1000:.0f} ms")
+        return True
+
+    def _before_element(self, elem, scheduler):
+        """元素执行前：等到计划开始时间、等待暂停结束并检查停止条件，返回本周期的屏幕观测；需终止时返回None"""
+        with self.stage_stats.timer(self._scope(elem), "调度等待"):
+            scheduler.wait()
+
+        # 检查暂停状态：阻塞等待恢复，不占用CPU
+        if self.is_paused:
+            scheduler.reset()
+        if not self.run_control.wait_while_paused():
+            return None  # 如果彻底停止，则退出
+
+        # 本周期的屏幕观测：停止校验与区域识别共用同一帧及其OCR结果
+        observation = self.observe() if self.is_running else None
+
+        # 执行前检查停止条件（保留）
+        if not self.is_running or self._stop_condition_met(observation):
+            self.reporter.status("停止条件满足，终止执行")
+            self.run_control.stop()
+            return None
+        return observation
+
+    def _after_element(self, elem, scheduler):
+        # 根据元素类型选择间隔时间，从本元素的计划开始时间起算，不再叠加执行耗时
+        if elem["type"] == "button":
+            scheduler.advance(self.workflow.button_interval)  # 按钮使用按钮间间隔
+        else:
+            scheduler.advance(self.workflow.interval)  # 识别区域使用元素间间隔
+        self._update_perf_status("schedule", scheduler.summary())
+
+    def _execute(self):
+        """执行主循环，返回"completed"、"stopped"或"error" """
+        workflow = self.workflow
+        loop_count = workflow.loop_count
+        scheduler = DeadlineScheduler(workflow.schedule_policy, sleep=self.run_control.sleep)
+        before_element = lambda elem: self._before_element(elem, scheduler)
+        after_element = lambda elem: self._after_element(elem, scheduler)
+        status = "stopped"
+        total_loops = 0
+
+        # 多进程OCR工作池在执行线程中启动，避免模型加载阻塞调用方
+        self._ensure_ocr_pool()
+
+        # 后台停止条件监视：按固定周期校验，与点击流程并行；未输入停止文本时无需监视
+        if workflow.stop_watch_period > 0 and workflow.stop_text.strip():
+            self.stop_watcher = StopWatcher(
+                self._watch_stop_condition,
+                workflow.stop_watch_period,
+                should_check=lambda: self.is_running and not self.is_paused,
+                on_trigger=self.run_control.interrupt,
+                on_exit=self._release_capture_thread
+            )
+            self.stop_watcher.start()
+        else:
+            self.stop_watcher = None
+
+        try:
+            while total_loops < loop_count and (self.is_running or self.is_paused):
+                # 检查暂停状态：阻塞等待恢复，不占用CPU
+                if not self.run_control.wait_while_paused():
+                    return status  # 如果彻底停止，则退出
+
+                # 每轮循环开始前检查停止条件
+                if self._stop_condition_met():
+                    self.reporter.status("停止条件满足，终止执行")
+                    self.run_control.stop()
+                    return status
+
+                total_loops += 1
+                self.reporter.status(f"正在执行第 {total_loops}/{loop_count} 轮循环")
+
+                # 按ID顺序执行所有元素（区分间隔类型）
+                if workflow.pipeline_mode:
+                    if not self._run_pipelined_pass(self.elements, before_element, after_element):
+                        return status
+                    continue
+
+                for elem in self.elements:
+                    observation = before_element(elem)
+                    if observation is None:
+                        return status
+
+                    # 执行元素操作
+                    if elem["type"] == "region":
+                        self.process_region(elem, observation)
+                    elif elem["type"] == "image":
+                        self.process_image(elem)
+                    elif elem["type"] == "button":
+                        self.process_button(elem)
+
+                    after_element(elem)
+
+            # 所有循环完成（循环中途被停止时total_loops不足）
+            if total_loops >= loop_count:
+                status = "completed"
+                self.reporter.status(f"所有 {loop_count} 轮循环执行完成")
+            return status
+        except Exception as e:
+            status = "error"
+            error_details = f"{type(e).__name__}: {str(e)}"
+            self.reporter.status(f"执行出错：{error_details}")
+            return status
+        finally:
+            if self.stop_watcher is not None:
+                self.stop_watcher.stop()
+            self._release_capture_thread()
+
+            # 只有在非暂停状态下才重置运行状态和收尾
+            if not self.is_paused:
+                self.run_control.stop()
+                self.last_status = status
+                self.export_stage_stats()
+                self.reporter.finished(status)
+
+    def _release_capture_thread(self):
+        """执行、监视及流水线各阶段线程结束前释放本线程的截图资源"""
+        try:
+            self.capture_backend.release_thread()
+        except Exception as err:
+            print(f"释放截图资源出错：{type(err).__name__}: {str(err)}")
+
+    def export_stage_stats(self):
+        """把本次运行的阶段耗时导出为output目录下的CSV，返回文件路径（无数据时返回None）"""
+        if not self.stage_stats.histograms:
+            return None
+        # 文件名精确到毫秒，同一秒内结束的多次运行（如基准测试的各场景）不互相覆盖
+        now = time.time()
+        stamp = f"{time.strftime('%Y%m%d_%H%M%S', time.localtime(now))}_{int(now * 1000) % 1000:03d}"
+        export_path = os.path.join(output_dir, f"stage_latency_{stamp}.csv")
+        suffix = 1
+        while os.path.exists(export_path):
+            export_path = os.path.join(output_dir, f"stage_latency_{stamp}_{suffix}.csv")
+            suffix += 1
+        try:
+            ensure_output_dir()
+            self.stage_stats.export_csv(export_path)
+        except Exception as err:
+            self._update_perf_status("stage_export", f"阶段耗时导出失败：{str(err)}")
+            return None
+        self._update_perf_status("stage_export", f"阶段耗时已导出：{export_path}")
+        return export_path
+
+    # ------------------------------ 帧采集与截图OCR识别 ------------------------------
+    def observe(self):
+        """返回当前屏幕观测：上一次观测仍在新鲜度窗口内则直接复用，否则重新截屏"""
+        with self._observation_lock:
+            observation = self.observation
+            if observation is not None and observation.is_fresh():
+                return observation
+            with self.stage_stats.timer("观测", "帧采集"):
+                frame = self.capture_tick_frame()
+            observation = ScreenObservation(frame, self.workflow.observation_max_age)
+            self.observation = observation
+            return observation
+
+    def invalidate_observation(self):
+        """点击等操作改变了画面，之后的判断必须重新观测"""
+        self.screen_changes += 1
+        if self.observation is not None:
+            self.observation.invalidate()
+
+    def _click(self, elem, x, y, action="click"):
+        """经输入后端点击屏幕坐标，耗时计入该元素的"点击"阶段"""
+        with self.stage_stats.timer(self._scope(elem), "点击"):
+            self.input_backend.click(x, y, action)
+        self._update_perf_status("input", self.input_backend.summary())
+
+    def capture_tick_frame(self):
+        """每个调度周期截屏一次（所有区域与停止区域的外接矩形），供本周期内的所有判断共用"""
+        coords_list = [e["data"]["coords"] for e in self.elements
+                       if e["type"] == "region" and e["data"]["coords"]]
+        if self.workflow.stop_coords:
+            coords_list.append(self.workflow.stop_coords)
+        if not coords_list:
+            return None
+        try:
+            return grab_frame(self.capture_backend, coords_list)
+        except Exception as err:
+            self.reporter.status(f"帧采集失败：{str(err)}，改为逐区域截图")
+            return None
+
+    def _region_image(self, coords, frame=None):
+        """优先从本周期的帧中裁剪区域视图，帧不可用时单独截图"""
+        if frame is not None and frame.contains(coords):
+            return frame.crop(coords)
+        x1, y1, w, h = coords
+        return self.capture_backend.grab((x1, y1, x1 + w, y1 + h))
+
+    def _run_predict(self, images, file_stems, scope="OCR"):
+        """执行一次predict调用并返回OCRResult列表
+
+        默认以内存数组直接送入管道、在内存中解析结果；调试模式下保存PNG按路径识别，
+        并额外导出结果JSON，二者均保留在磁盘上供排查。
+        """
+        debug = self.workflow.debug_ocr_files
+        if debug:
+            inputs = []
+            with self.stage_stats.timer(scope, "PNG保存"):
+                ensure_output_dir()
+                for image, file_stem in zip(images, file_stems):
+                    temp_img = f"{file_stem}.png"
+                    Image.fromarray(np.ascontiguousarray(image[:, :, ::-1])).save(temp_img)
+                    if not os.path.exists(temp_img):
+                        raise Exception(f"截图文件未生成：{temp_img}")
+                    inputs.append(temp_img)
+        else:
+            inputs = list(images)
+
+        # 调试模式需要PaddleX结果对象导出JSON，始终在本进程内识别
+        pool = self.ocr_pool
+        if pool is not None and not debug and pool.is_alive:
+            with self.stage_stats.timer(scope, "predict"):
+                return [OCRResult(res) for res in pool.predict(inputs, self.field_schema.field_paths())]
+
+        with self.stage_stats.timer(scope, "predict"):
+            output = self.ocr_engine.predict(inputs)
+        if debug:
+            with self.stage_stats.timer(scope, "JSON导出"):
+                for res, file_stem in zip(output, file_stems):
+                    res.save_to_json(f"{file_stem}_res.json")
+        return [OCRResult(res) for res in output]
+
+    def _ensure_ocr_pool(self):
+        """按当前配置准备OCR工作池；配置变化时重建，进程数为0时关闭"""
+        worker_count, worker_threads = self.workflow.ocr_worker_count, self.workflow.ocr_worker_threads
+        pool = self.ocr_pool
+        if pool is not None and pool.is_alive and pool.worker_count == worker_count \
+                and pool.cpu_threads == worker_threads:
+            return
+        if pool is not None:
+            pool.shutdown()
+            self.ocr_pool = None
+        if worker_count <= 0:
+            return
+
+        self.reporter.status(f"正在启动 {worker_count} 个OCR工作进程...")
+        pool = OCRWorkerPool(worker_count, worker_threads)
+        try:
+            pool.start()
+            self.ocr_pool = pool
+        except Exception as err:
+            self.reporter.status(f"{str(err)}，改为在本进程内识别")
+
+    def _predict_batch(self, items, file_prefix, scope="OCR"):
+        """批量OCR：items为[(key, image)]，按最大批大小分组调用predict
+
+        返回{key: OCRResult}，某一批识别失败时该批所有key对应的值为异常对象。
+        scope为阶段耗时统计的作用域（区域名或"停止校验"）。
+        """
+        results = {}
+        # 调试模式需要每次都落盘，跳过缓存
+        use_cache = not self.workflow.debug_ocr_files
+        pending = []  # [(key, image, cache_key)]
+        with self.stage_stats.timer(scope, "缓存查找"):
+            for key, image in items:
+                cache_key = OCRResultCache.make_key(image) if use_cache else None
+                cached = self.ocr_cache.get(cache_key) if use_cache else None
+                if cached is not None:
+                    results[key] = cached
+                else:
+                    pending.append((key, image, cache_key))
+
+        batch_size = max(1, self.workflow.ocr_batch_size)
+        timestamp = int(time.time() * 1000000)
+        for start in range(0, len(pending), batch_size):
+            chunk = pending[start:start + batch_size]
+            file_stems = [os.path.join(output_dir, f"{file_prefix}_{key}_{timestamp}") for key, _, _ in chunk]
+            try:
+                output = self._run_predict([image for _, image, _ in chunk], file_stems, scope)
+                if len(output) != len(chunk):
+                    raise Exception(f"OCR结果数量与输入不符：{len(output)}/{len(chunk)}")
+                for (key, _, cache_key), result in zip(chunk, output):
+                    if use_cache:
+                        result = result.compact(self.field_schema)
+                        self.ocr_cache.put(cache_key, result)
+                    results[key] = result
+            except Exception as err:
+                for key, _, _ in chunk:
+                    results[key] = err
+
+        if use_cache:
+            self._update_perf_status("cache", self.ocr_cache.summary())
+        return results
+
+    # ------------------------------ OCR字段配置 ------------------------------
+    def build_field_schema(self):
+        """编译工作流中的文本/坐标字段配置（于运行开始时调用），未配置时使用默认查找路径"""
+        text_fields = self.workflow.text_fields or DEFAULT_TEXT_FIELDS
+        bbox_fields = self.workflow.bbox_fields or DEFAULT_BBOX_FIELDS
+
+        def on_detect(kind, path):
+            self._update_perf_status(f"schema_{kind}", f"{'文本' if kind == 'text' else '坐标'}字段：{path}")
+
+        return OCRFieldSchema(text_fields, bbox_fields, on_detect=on_detect)
+
+    # ------------------------------ 目标匹配器 ------------------------------
+    def _matcher_for(self, spec):
+        """按目标配置取匹配器，同一配置在一次运行内只构建一次"""
+        matcher = self._matchers.get(spec)
+        if matcher is None:
+            matcher = TargetMatcher(parse_targets(spec))
+            self._matchers[spec] = matcher
+        return matcher
+
+    def _template_absent(self, coords, specs, image):
+        """模板预筛：specs中全部目标在图像中明确不存在时返回True"""
+        if not self.workflow.template_prefilter:
+            return False
+        target_norms = []
+        for spec in specs:
+            keys = self._matcher_for(spec).template_keys()
+            if keys is None:
+                return False
+            target_norms.extend(keys)
+        if not self.template_prefilter.absent(coords, target_norms, image):
+            return False
+        self._update_perf_status("template", f"模板预筛跳过OCR：{self.template_prefilter.skips}次，"
+                                             f"校验{self.template_prefilter.verifications}次")
+        return True
+
+    def _learn_templates(self, coords, specs, image, result):
+        """OCR命中精确目标时记录其截图片段，供后续模板预筛使用
+
+        若本次OCR是预筛放行的校验且仍识别到目标，说明模板判断有误，丢弃这些目标的模板。
+        """
+        if not self.workflow.template_prefilter or isinstance(result, Exception):
+            return
+        norm_texts = normalize_many(self.field_schema.texts(result))
+        boxes = self.field_schema.boxes(result)
+        found = []
+        for spec in specs:
+            matcher = self._matcher_for(spec)
+            for index, line in enumerate(norm_texts):
+                for target in matcher.exact.get(line, ()):
+                    if index < len(boxes):
+                        found.append((target.norm, boxes[index]))
+        if self.template_prefilter.finish_verification(coords):
+            for target_norm, _ in found:
+                self.template_prefilter.forget(coords, target_norm)
+            return
+        for target_norm, bbox in found:
+            self.template_prefilter.remember(coords, target_norm, image, bbox)
+
+    # ------------------------------ 停止条件校验 ------------------------------
+    def check_stop_condition(self, observation=None):
+        if not self.is_running:
+            return True
+
+        target_text = self.workflow.stop_text.strip()
+        if not target_text:
+            # 每次运行只提示一次，避免覆盖循环进度
+            if not self._stop_text_warned:
+                self._stop_text_warned = True
+                self.reporter.status("警告：未输入目标停止文本，继续执行...")
+            return False
+        return self._stop_text_matched(target_text, observation)
+
+    def _watch_stop_condition(self):
+        """后台监视使用的停止校验：已暂停或已停止时不认定满足停止条件（由执行线程自行处理）"""
+        target_text = self.workflow.stop_text.strip()
+        if not target_text or not self.is_running or self.is_paused:
+            return False
+        return self._stop_text_matched(target_text, self.observe())
+
+    def _stop_text_matched(self, target_text, observation=None):
+        """停止区域或任一识别区域识别到停止文本时返回True"""
+        # 停止区域与所有识别区域合并为批量OCR，结果按区域回填并记入本次观测
+        if observation is None:
+            observation = self.observe()
+        results = self._ocr_stop_targets(observation, target_text)
+
+        # 校验1：停止区域文本匹配（优先检查）
+        stop_region_match = self._check_stop_region_match(target_text, results.get("stop"))
+        if stop_region_match:
+            return True
+
+        # 校验2：识别区域文本匹配（任一区域匹配则停止）
+        region_match = self._check_any_region_match(target_text, results)
+        return region_match
+
+    def _ocr_stop_targets(self, observation, stop_text=""):
+        """收集停止区域（键为"stop"）与各识别区域（键为current_id）的OCR结果
+
+        本次观测中已有结果的区域直接复用，其余区域的图像合并批量OCR后记入观测。
+        启用模板预筛时，停止文本与区域目标都明确不在画面中的区域跳过OCR，结果记为None。
+        """
+        targets = []
+        if self.workflow.stop_coords:
+            targets.append(("stop", self.workflow.stop_coords, [stop_text]))
+        for region in self.elements:
+            data = region["data"]
+            if region["type"] == "region" and data["coords"]:
+                targets.append((data["current_id"], data["coords"],
+                                [stop_text, data["target_text"]]))
+
+        results = {}
+        items = []
+        pending = {}
+        for key, coords, specs in targets:
+            specs = [spec for spec in specs if spec]
+            cached = observation.get(key)
+            if cached is not None:
+                results[key] = cached
+                continue
+            try:
+                image = self._region_image(coords, observation.frame)
+            except Exception as img_err:
+                results[key] = Exception(f"截图失败：{type(img_err).__name__}: {str(img_err)}")
+                continue
+            if self._template_absent(coords, specs, image):
+                results[key] = None
+                continue
+            items.append((key, image))
+            pending[key] = (coords, specs, image)
+
+        if not items:
+            return results
+
+        # 停止区域与识别区域共用同一个OCR引擎，合并到同一次predict调用
+        for key, result in self._predict_batch(items, "stop_check", "停止校验").items():
+            if not isinstance(result, Exception):
+                observation.put(key, result)
+                self._learn_templates(*pending[key], result)
+            results[key] = result
+        return results
+
+    def _check_stop_region_match(self, target_text, result):
+        if not self.workflow.stop_coords or result is None:
+            return False
+
+        if isinstance(result, Exception):
+            self.reporter.status(f"停止区域校验出错：{str(result)}，继续执行...")
+            return False
+
+        try:
+            # 直接从结果对象中解析文本并归一化匹配（停止文本同样支持"|"分隔多个目标）
+            with self.stage_stats.timer("停止校验", "匹配"):
+                ocr_texts = self.field_schema.texts(result)
+                match = self._matcher_for(target_text).find(normalize_many(ocr_texts)) is not None
+            if match:
+                self.reporter.status(f"停止区域匹配成功：识别到「{ocr_texts}」=目标「{target_text}」")
+            return match
+
+        except Exception as err:
+            self.reporter.status(f"停止区域校验出错：{str(err)}，继续执行...")
+            return False
+
+    def _check_any_region_match(self, target_text, results):
+        regions = [e for e in self.elements if e["type"] == "region"]
+        if not regions:
+            return False
+
+        for region in regions:
+            data = region["data"]
+            result = results.get(data["current_id"])
+            if not data["coords"] or result is None:
+                continue
+
+            try:
+                if isinstance(result, Exception):
+                    raise Exception(f"OCR识别失败：{type(result).__name__}: {str(result)}")
+
+                # 直接从结果对象中解析文本
+                with self.stage_stats.timer("停止校验", "匹配"):
+                    ocr_texts = self.field_schema.texts(result)
+                    match = self._matcher_for(target_text).find(normalize_many(ocr_texts)) is not None
+
+                if match:
+                    self.reporter.status(
+                        f"识别区域{data['current_id']}匹配成功：识别到「{ocr_texts}」=目标「{target_text}」")
+                    return True
+
+            except Exception as err:
+                error_type = type(err).__name__
+                error_message = f"{error_type}: {str(err)}"
+                self.reporter.status(f"识别区域{data['current_id']}校验出错：{error_message}，继续执行...")
+                continue
+
+        return False
+
+    # ------------------------------ 处理识别区域（实时识别） ------------------------------
+    def process_region(self, elem, observation=None):
+        outcome = self._recognize_region(elem, observation=observation)
+        self._act_on_region(elem, self._await_region(elem, outcome))
+
+    def _await_region(self, elem, outcome):
+        """等待模式：目标尚未出现时按画面变化自适应轮询，直至匹配、超时或停止执行
+
+        画面不变时不做OCR，轮询间隔按WAIT_BACKOFF逐步放大到WAIT_POLL_MAX；
+        一旦检测到像素变化立即识别，并把间隔重置为WAIT_POLL_MIN。
+        """
+        data = elem["data"]
+        if not outcome.get("missing"):
+            return outcome
+        try:
+            timeout = float(data["wait"] or 0)
+        except (TypeError, ValueError):
+            return {"message": "跳过：等待时间须为非负数"}
+        if timeout <= 0:
+            return outcome
+
+        start = time.monotonic()
+        with self.stage_stats.timer(self._scope(elem), "等待出现"):
+            outcome = self._poll_until_match(elem, outcome, start, timeout)
+        return outcome
+
+    def _poll_until_match(self, elem, outcome, start, timeout):
+        """等待模式的轮询循环，返回最终结果字典"""
+        data = elem["data"]
+        deadline = start + timeout
+        delay = WAIT_POLL_MIN
+        previous = None
+        polls = 0
+        while not self._should_halt():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            self.reporter.element_status(elem, f"等待目标出现：已等待{time.monotonic() - start:.1f}秒 / {timeout:g}秒")
+            if not self.run_control.sleep(min(delay, remaining)) and self._should_halt():
+                break
+            try:
+                image = self._region_image(data["coords"])
+            except Exception:
+                delay = min(delay * WAIT_BACKOFF, WAIT_POLL_MAX)
+                continue
+            if not pixels_changed(previous, image):
+                delay = min(delay * WAIT_BACKOFF, WAIT_POLL_MAX)
+                continue
+            previous = image
+            delay = WAIT_POLL_MIN
+            polls += 1
+            outcome = self._recognize_region(elem, image=image)
+            if not outcome.get("missing"):
+                if "message" not in outcome:
+                    waited = time.monotonic() - start
+                    data["wait_stats"]["times"].append(waited)
+                    outcome["match_note"] += f"（等待{waited:.2f}秒出现，识别{polls}次；{self._wait_summary(data)}）"
+                return outcome
+
+        if self._should_halt():
+            return outcome
+        data["wait_stats"]["timeouts"] += 1
+        return {"message": f"等待超时（{timeout:g}秒，识别{polls}次）：{outcome['message']}；{self._wait_summary(data)}"}
+
+    def _wait_summary(self, data):
+        """区域的目标出现耗时统计"""
+        times = sorted(data["wait_stats"]["times"])
+        timeouts = data["wait_stats"]["timeouts"]
+        if not times:
+            return f"超时{timeouts}次"
+        median = times[len(times) // 2]
+        return (f"出现耗时中位{median:.2f}秒，平均{sum(times) / len(times):.2f}秒，"
+                f"最长{times[-1]:.2f}秒，共{len(times)}次，超时{timeouts}次")
+
+    def _recognize_region(self, elem, observation=None, image=None):
+        """识别阶段：取区域图像、OCR并匹配目标文本，不执行点击
+
+        返回结果字典：含"message"表示无需点击（跳过、出错或未匹配）；
+        否则含target_text/matched_text/matched_bbox，交给执行阶段点击。
+        image为等待模式轮询时已截取的区域图像。
+        """
+        data = elem["data"]
+        scope = self._scope(elem)
+        target_text = data["target_text"]
+        if not target_text:
+            return {"message": "跳过：未设置目标匹配文本"}
+
+        if not data["coords"]:
+            return {"message": "跳过：区域未配置"}
+
+        try:
+            tolerance = parse_tolerance(data["tolerance"])
+        except ValueError:
+            return {"message": "跳过：容错须为整数编辑距离或0~1之间的相似度"}
+
+        try:
+            result = None
+            if image is None:
+                if observation is None:
+                    observation = self.observe()
+                # 停止校验已在本次观测中识别过该区域时直接复用结果
+                result = observation.get(data["current_id"])
+
+            if result is None:
+                # 从本次观测的帧中裁剪区域（帧不可用时单独截图）
+                if image is None:
+                    try:
+                        with self.stage_stats.timer(scope, "截图"):
+                            image = self._region_image(data["coords"], observation.frame)
+                    except Exception as img_err:
+                        image = img_err
+                if isinstance(image, Exception):
+                    return {"message": f"区域截图失败：{type(image).__name__}: {str(image)}"}
+
+                # 模板预筛：目标明确不在画面中时跳过整次OCR（模糊匹配下无法据模板判断）
+                with self.stage_stats.timer(scope, "模板预筛"):
+                    absent = tolerance is None and self._template_absent(data["coords"], [target_text], image)
+                if absent:
+                    return {"message": f"模板预筛：未发现目标「{target_text}」，跳过OCR", "missing": True}
+
+                # 上一次命中位置附近的小块先识别，命中即可跳过整区域OCR
+                with self.stage_stats.timer(scope, "末次位置"):
+                    outcome = self._recognize_last_hit(data, target_text, tolerance, image)
+                if outcome is not None:
+                    return outcome
+
+                # 执行OCR识别
+                try:
+                    # 经由缓存的批量接口识别，画面未变化时直接复用上次结果
+                    result = self._predict_batch([(data["current_id"], image)], "region_current",
+                                                 scope)[data["current_id"]]
+                    if isinstance(result, Exception):
+                        raise result
+                    if observation is not None:
+                        observation.put(data["current_id"], result)
+                    self._learn_templates(data["coords"], [target_text], image, result)
+                except Exception as ocr_err:
+                    return {"message": f"OCR识别失败：{type(ocr_err).__name__}: {str(ocr_err)}"}
+
+            with self.stage_stats.timer(scope, "匹配"):
+                outcome = self._match_region_result(target_text, tolerance, result)
+            if "matched_bbox" in outcome and outcome["priority"] == 0:
+                data["last_hit"] = outcome["matched_bbox"]
+            return outcome
+
+        except Exception as err:
+            error_type = type(err).__name__
+            error_message = f"{error_type}: {str(err)}"
+            print(f"process_region异常：{error_message}")
+            return {"message": f"处理失败：{error_message}"}
+
+    def _recognize_last_hit(self, data, target_text, tolerance, image):
+        """末次命中跟踪：只识别上次命中框外扩后的小块，命中时返回结果（坐标换算回区域内），未命中返回None
+
+        只在上次命中的是最高优先级目标时启用，小块中的命中即为整区域识别的结果；
+        未命中时清除记录，交由整区域OCR重新定位。
+        """
+        last_hit = data.get("last_hit")
+        if last_hit is None:
+            return None
+        self.roi_stats["attempts"] += 1
+        height, width = image.shape[:2]
+        x1, y1, x2, y2 = map(float, last_hit)
+        pad = max(ROI_MIN_PADDING, int((y2 - y1) * ROI_PADDING_RATIO))
+        ox, oy = max(0, int(x1) - pad), max(0, int(y1) - pad)
+        ex, ey = min(width, int(x2) + pad), min(height, int(y2) + pad)
+        if ex - ox < 8 or ey - oy < 8:
+            data["last_hit"] = None
+            return None
+
+        sub_image = image[oy:ey, ox:ex]
+        key = f"{data['current_id']}_roi"
+        result = self._predict_batch([(key, sub_image)], "region_roi", f"{ELEMENT_TYPE_NAMES['region']}{data['current_id']}·末次")[key]
+        outcome = None
+        if not isinstance(result, Exception):
+            self._learn_templates(data["coords"], [target_text], sub_image, result)
+            outcome = self._match_region_result(target_text, tolerance, result, offset=(ox, oy))
+        if outcome is None or "matched_bbox" not in outcome or outcome["priority"] != 0:
+            data["last_hit"] = None
+            self._update_roi_status()
+            return None
+
+        data["last_hit"] = outcome["matched_bbox"]
+        self.roi_stats["hits"] += 1
+        self._update_roi_status()
+        outcome["match_note"] += "（末次位置命中）"
+        return outcome
+
+    def _update_roi_status(self):
+        attempts = self.roi_stats["attempts"]
+        self._update_perf_status(
+            "roi", f"末次位置命中：{self.roi_stats['hits']}/{attempts}（{self.roi_stats['hits'] / attempts:.0%}）")
+
+    def _match_region_result(self, target_text, tolerance, result, offset=(0, 0)):
+        """在OCR结果中匹配区域目标，返回结果字典（含"message"表示无需点击）
+
+        offset为识别图像左上角在区域内的偏移，命中坐标据此换算回区域坐标。
+        """
+        # 按本次运行编译好的字段配置提取所有文本
+        all_texts = self.field_schema.texts(result)
+        if not all_texts:
+            return {"message": "未识别到任何文本（检查文本字段配置）", "missing": True}
+
+        # 提取所有坐标
+        all_bboxes = self.field_schema.boxes(result)
+
+        # 与停止校验共用同一标准化规则；一次扫描所有OCR行即可解析区域内的全部目标
+        matcher = self._matcher_for(target_text)
+        norm_texts = normalize_many(all_texts)
+        hit = matcher.find(norm_texts)
+        match_note = ""
+        if hit is None and tolerance is not None:
+            # 精确/包含匹配落空时再做容错匹配，吸收0/O、漏字等OCR噪声
+            fuzzy = matcher.find_fuzzy(norm_texts, tolerance)
+            if fuzzy is not None:
+                hit = fuzzy[:2]
+                match_note = f"（模糊匹配：编辑距离{fuzzy[2]}，相似度{fuzzy[3]:.2f}）"
+        if hit is None:
+            return {"message": f"匹配失败：识别到{str(all_texts)} ≠ {target_text}", "missing": True}
+
+        # 匹配文本并关联坐标
+        target, line_index = hit
+        matched_text = all_texts[line_index]
+        matched_bbox = all_bboxes[line_index] if line_index < len(all_bboxes) else None
+        if target.action in ("stop", "none"):
+            return {"target_text": target.text, "matched_text": matched_text, "action": target.action,
+                    "match_note": match_note, "priority": target.priority}
+        if not matched_bbox:
+            return {"message": f"匹配成功但无坐标：{matched_text} = {target.text}{match_note}（检查坐标字段配置）"}
+        ox, oy = offset
+        x1, y1, x2, y2 = map(float, matched_bbox)
+        return {"target_text": target.text, "matched_text": matched_text,
+                "matched_bbox": (x1 + ox, y1 + oy, x2 + ox, y2 + oy),
+                "action": target.action, "match_note": match_note, "priority": target.priority}
+
+    def _act_on_region(self, elem, outcome):
+        """执行阶段：按目标动作点击匹配文本的中心（或停止/仅记录）并更新区域状态"""
+        data = elem["data"]
+        if "message" in outcome:
+            self.reporter.element_status(elem, outcome["message"])
+            return
+
+        action = outcome.get("action", "click")
+        if action == "none":
+            self.reporter.element_status(
+                elem, f"匹配成功（仅识别）：{outcome['matched_text']} = {outcome['target_text']}{outcome['match_note']}")
+            return
+        if action == "stop":
+            self.run_control.stop()
+            msg = f"匹配成功，按目标动作停止执行：{outcome['matched_text']} = {outcome['target_text']}{outcome['match_note']}"
+            self.reporter.element_status(elem, msg)
+            self.reporter.status(f"识别区域{data['current_id']}{msg}")
+            return
+
+        # 计算屏幕坐标
+        try:
+            region_x1, region_y1, _, _ = data["coords"]
+            text_x1, text_y1, text_x2, text_y2 = map(float, outcome["matched_bbox"])
+            screen_click_x = region_x1 + (text_x1 + text_x2) / 2
+            screen_click_y = region_y1 + (text_y1 + text_y2) / 2
+            # 执行点击（单击/双击/右键）
+            self._click(elem, screen_click_x, screen_click_y, action)
+            self.invalidate_observation()
+            result_msg = (f"匹配成功并{TARGET_ACTION_NAMES[action]}：{outcome['matched_text']} = {outcome['target_text']}"
+                          f"{outcome['match_note']}（坐标：{int(screen_click_x)},{int(screen_click_y)}）")
+            self.reporter.element_status(elem, result_msg)
+        except Exception as click_err:
+            self.reporter.element_status(elem, f"点击执行失败：{type(click_err).__name__}: {str(click_err)}")
+
+    # ------------------------------ 流水线执行 ------------------------------
+    def _may_click(self, elem):
+        """元素执行时是否可能点击（点击会改变画面，之后的画面才能用于后续元素的判断）"""
+        data = elem["data"]
+        if elem["type"] == "button":
+            return True
+        if elem["type"] == "image":
+            return data["template"] is not None
+        return bool(data["target_text"]) and any(
+            target.action in INPUT_ACTIONS for target in self._matcher_for(data["target_text"]).targets)
+
+    def _run_pipelined_pass(self, elements, before_element, after_element):
+        """流水线执行一轮元素：截图、OCR、点击三个阶段由有界队列相连、并行推进
+
+        截图阶段经observe()取本周期的屏幕观测，与停止校验共用同一帧及其OCR结果，不额外截屏；
+        遇到可能点击的元素时不再向后预取，直到该元素未点击，或点击后下一元素的计划开始时间已到。
+        执行阶段按current_id顺序点击；预取所依据的画面已被点击改变或超过识别结果有效期时，
+        按当前观测重新识别。before_element返回None时中止本轮。返回True表示本轮全部执行完毕。
+        """
+        # 阶段间各为容量1的队列；所有等待都阻塞在progress条件上，入队、出队、放行与取消时统一唤醒
+        capture_queue = deque()
+        ocr_queue = deque()
+        cancel = threading.Event()
+        progress = threading.Condition()
+        released = [0]  # 截图阶段可以越过的元素数：这些元素已执行完且不会再改变画面
+
+        def put(q, item):
+            with progress:
+                while q and not cancel.is_set():
+                    progress.wait()
+                if cancel.is_set():
+                    return False
+                q.append(item)
+                progress.notify_all()
+                return True
+
+        def get(q):
+            with progress:
+                while not q and not cancel.is_set():
+                    progress.wait()
+                if cancel.is_set():
+                    return False, None
+                item = q.popleft()
+                progress.notify_all()
+                return True, item
+
+        def release(count):
+            with progress:
+                if count > released[0]:
+                    released[0] = count
+                    progress.notify_all()
+
+        def wait_released(count):
+            with progress:
+                while released[0] < count and not cancel.is_set():
+                    progress.wait()
+            return not cancel.is_set()
+
+        def stop_stages():
+            with progress:
+                cancel.set()
+                progress.notify_all()
+
+        def capture_stage():
+            for index, elem in enumerate(elements):
+                changes = self.screen_changes
+                captured = time.monotonic()
+                source = None
+                try:
+                    if elem["type"] == "region" and elem["data"]["coords"]:
+                        source = self.observe()
+                    elif elem["type"] == "image" and elem["data"]["template"] is not None:
+                        source = grab_frame(self.capture_backend)
+                except Exception as img_err:
+                    source = img_err
+                if not put(capture_queue, (elem, source, changes, captured)):
+                    return
+                # 不越过可能点击的元素预取：等它执行完且画面已稳定后再截取下一元素
+                if self._may_click(elem) and not wait_released(index + 1):
+                    return
+
+        def ocr_stage():
+            for _ in elements:
+                ok, item = get(capture_queue)
+                if not ok:
+                    return
+                elem, source, changes, captured = item
+                outcome = None
+                if elem["type"] == "region":
+                    if isinstance(source, Exception):
+                        outcome = {"message": f"区域截图失败：{type(source).__name__}: {str(source)}"}
+                    else:
+                        outcome = self._recognize_region(elem, observation=source)
+                elif elem["type"] == "image":
+                    outcome = self._locate_image(elem, source)
+                if not put(ocr_queue, (outcome, changes, captured)):
+                    return
+
+        def stage_thread(stage):
+            def run():
+                try:
+                    stage()
+                finally:
+                    self._release_capture_thread()
+            return threading.Thread(target=run, daemon=True)
+
+        stages = [stage_thread(capture_stage), stage_thread(ocr_stage)]
+        for stage in stages:
+            stage.start()
+
+        try:
+            for index, elem in enumerate(elements):
+                observation = before_element(elem)
+                if observation is None:
+                    return False
+                # 计划开始时间已到：上一元素点击后的画面已稳定，截图阶段可以截取
+                release(index)
+                ok, item = get(ocr_queue)
+                if not ok:
+                    return False
+                outcome, changes, captured = item
+                # 预取之后画面被点击改变或结果已过有效期：按当前观测重新识别，不用点击前的画面做决策
+                if changes != self.screen_changes or \
+                        time.monotonic() - captured > self.workflow.observation_max_age:
+                    if elem["type"] == "region":
+                        outcome = self._recognize_region(elem, observation=observation)
+                    elif elem["type"] == "image":
+                        outcome = self._locate_image(elem)
+
+                changes = self.screen_changes
+                if elem["type"] == "region":
+                    self._act_on_region(elem, self._await_region(elem, outcome))
+                elif elem["type"] == "image":
+                    self._act_on_image(elem, outcome)
+                elif elem["type"] == "button":
+                    self.process_button(elem)
+                if self.screen_changes == changes:
+                    release(index + 1)  # 本元素未点击，画面未变，截图阶段可以继续预取
+                after_element(elem)
+            return True
+        finally:
+            stop_stages()
+
+    # ------------------------------ 处理图片元素 ------------------------------
+    def process_image(self, elem):
+        """整屏多尺度模板匹配定位图片元素并点击最佳匹配中心，不经过OCR"""
+        self._act_on_image(elem, self._locate_image(elem))
+
+    def _locate_image(self, elem, frame=None):
+        """定位阶段：在整屏截图中搜索模板，返回结果字典（含"message"表示无需点击）
+
+        frame为流水线截图阶段预先截取的整屏帧（截图失败时为异常对象）。
+        """
+        data = elem["data"]
+        if data["template"] is None:
+            return {"message": "跳过：未截取模板图像"}
+
+        try:
+            threshold = float(data["threshold"])
+        except (TypeError, ValueError):
+            return {"message": "跳过：匹配阈值须为0~1之间的数值"}
+
+        try:
+            if frame is None:
+                with self.stage_stats.timer(self._scope(elem), "截图"):
+                    frame = grab_frame(self.capture_backend)
+            if isinstance(frame, Exception):
+                return {"message": f"截图失败：{type(frame).__name__}: {str(frame)}"}
+            with self.stage_stats.timer(self._scope(elem), "模板匹配"):
+                screen = cv2.cvtColor(frame.array, cv2.COLOR_BGR2GRAY)
+                best = locate_template(screen, data["template"])
+        except Exception as err:
+            return {"message": f"图片匹配出错：{type(err).__name__}: {str(err)}"}
+
+        if best is None:
+            return {"message": "匹配失败：模板大于屏幕截图"}
+        score, (x1, y1, x2, y2), scale = best
+        if score < threshold:
+            return {"message": f"匹配失败：最高得分{score:.2f} < 阈值{threshold:.2f}"}
+        ox, oy = frame.origin
+        return {"score": score, "scale": scale,
+                "click": (ox + (x1 + x2) // 2, oy + (y1 + y2) // 2)}
+
+    def _act_on_image(self, elem, outcome):
+        """执行阶段：点击图片匹配中心并更新状态"""
+        if "message" in outcome:
+            self.reporter.element_status(elem, outcome["message"])
+            return
+
+        click_x, click_y = outcome["click"]
+        try:
+            self._click(elem, click_x, click_y)
+            self.invalidate_observation()
+            result_msg = (f"图片匹配成功并点击：得分{outcome['score']:.2f}，缩放{outcome['scale']:.2f}"
+                          f"（坐标：{int(click_x)},{int(click_y)}）")
+        except Exception as click_err:
+            result_msg = f"点击执行失败：{type(click_err).__name__}: {str(click_err)}"
+        self.reporter.element_status(elem, result_msg)
+
+    # ------------------------------ 处理按钮点击 ------------------------------
+    def process_button(self, elem):
+        data = elem["data"]
+
+        click_x = data["x"] + data["width"] // 2 + self.workflow.x_offset
+        click_y = data["y"] + data["height"] // 2 + self.workflow.y_offset
+
+        # 恢复异常处理，确保点击失败不会导致程序崩溃
+        try:
+            self._click(elem, click_x, click_y)
+            self.invalidate_observation()
+            self.reporter.element_status(elem, f"已点击：({click_x}, {click_y})")
+        except Exception as click_err:
+            error_msg = f"点击执行失败：{type(click_err).__name__}: {str(click_err)}"
+            print(f"process_button点击异常：{error_msg}")
+            self.reporter.element_status(elem, error_msg)
 
 
 class FlowFrame(tk.Frame):
@@ -135,7 +3165,7 @@ class ElementFrame(tk.Frame):
         super().__init__(master, **kwargs)
         self.bind("<Configure>", self.on_resize)
         # 配置列权重
-        for i in range(6):  # 假设最多6列
+        for i in range(10):  # 最多10列（识别区域含容错、等待列）
             self.grid_columnconfigure(i, weight=0)
         # 状态标签列应该可以伸缩
         self.grid_columnconfigure(1, weight=1)
@@ -146,12 +3176,31 @@ class ElementFrame(tk.Frame):
             grid_info = widget.grid_info()
             if grid_info.get('column') == 1:  # 状态标签列
                 # 调整wraplength，确保文本能正确换行
-                new_wraplength = event.width - 400  # 固定偏移量
+                new_wraplength = event.width - 560  # 固定偏移量
                 if new_wraplength < 200:
                     new_wraplength = 200  # 最小宽度限制
                 widget.configure(wraplength=new_wraplength)
 
 
+class TkReporter(ExecutionReporter):
+    """窗口客户端的输出：执行线程中的状态更新经root.after转到界面线程"""
+
+    def __init__(self, app):
+        self.app = app
+
+    def status(self, text):
+        self.app.root.after(0, lambda: self.app.status_var.set(text))
+
+    def element_status(self, elem, text):
+        self.app.root.after(0, lambda: self.app.set_element_status(elem["data"]["current_id"], text))
+
+    def perf(self, key, text):
+        self.app._update_perf_status(key, text)
+
+    def finished(self, status):
+        self.app.root.after(0, lambda: self.app.finalize_execution(status))
+
+
 class RealTimeControl:
     def __init__(self):
         self.root = tk.Tk()
@@ -164,7 +3213,7 @@ class RealTimeControl:
 
         # 确保窗口可调整大小，并设置所有行和列的权重
         # 关键改进：给所有行设置适当的权重
-        for i in range(6):  # 假设总共6行
+        for i in range(8):  # 假设总共8行
             if i == 4:  # 滚动区域行应该占据大部分空间
                 self.root.grid_rowconfigure(i, weight=100)
             else:  # 其他行保持较小权重
@@ -174,8 +3223,15 @@ class RealTimeControl:
         self.root.grid_columnconfigure(0, weight=1, minsize=600)  # 设置合理的最小宽度
 
         self.elements = []  # 存储所有元素（按钮/识别区域）
-        self.is_running = False  # 执行状态标记
-        self.is_paused = False  # 暂停状态标记
+        # 执行核心：截图、OCR、匹配与点击均在其中完成，窗口只负责收集配置和展示状态
+        self.executor = Executor(TkReporter(self))
+        self.run_control = self.executor.run_control  # 运行/暂停/停止状态
+        self.stage_stats = self.executor.stage_stats  # 各区域/按钮热路径的分阶段耗时
+        self.ocr_cache = self.executor.ocr_cache
+        self.ocr_engine = self.executor.ocr_engine
+        self.capture_backends = self.executor.capture_backends
+        self.capture_report = self.executor.capture_report
+        self.capture_best = self.executor.capture_best
         self.drag_data = {"x": 0, "y": 0, "widget": None, "elem": None}
         self.number_marks = ["①", "②", "③", "④", "⑤", "⑥", "⑦", "⑧", "⑨", "⑩"]
 
@@ -183,106 +3239,54 @@ class RealTimeControl:
         self.select_window_type = ""
 
         # 停止条件配置
-        img_basename = "stop_condition_base.png"
         self.stop_condition = {
             "coords": None,  # 停止区域坐标 (x1, y1, w, h)
-            "base_img_path": os.path.join(output_dir, img_basename),
+            "base_img_path": os.path.join(output_dir, STOP_BASE_IMAGE),
             "target_text": "",  # 目标停止文本
-            "is_set": False,  # 是否已设置停止区域
-            "ocr_text_fields": ["rec_texts", "text", "words", "content", "result.text"],
-            "ocr_bbox_fields": [
-                "rec_boxes", "bbox", "boxes", "coordinates", "position", "locations",
-                "bounding_box", "rect", "result.bbox", "regions.bbox"
-            ]
+            "is_set": False  # 是否已设置停止区域
         }
 
-        # OCR管道
-        self.region_ocr_pipeline = None  # 识别区域专用（常驻）
-        self.stop_ocr_pipeline = None  # 停止区域专用（即用即毁）
-
-        # 初始化识别区域管道
-        self.init_region_ocr_pipeline()
+        # OCR引擎：识别区域与停止区域共用，进程内只加载一次
+        self.init_ocr_engine()
         self.create_ui()
+        self._update_perf_status("capture", capture_summary(self.capture_backend.name, self.capture_report))
+        self._update_perf_status("input", self.input_backend.summary())
         self.register_hotkeys()
         
         # 绑定窗口关闭事件
         self.root.protocol("WM_DELETE_WINDOW", self.on_exit_request)
 
-    # ------------------------------ OCR管道管理 ------------------------------
-    def init_region_ocr_pipeline(self):
+    # ------------------------------ OCR引擎管理 ------------------------------
+    def init_ocr_engine(self):
+        """确保共享OCR引擎已加载（已加载时直接返回）"""
         try:
-            # 无论是否已存在，都重新创建pipeline实例，避免状态问题
-            if self.region_ocr_pipeline is not None:
-                try:
-                    del self.region_ocr_pipeline
-                except:
-                    pass
-            
-            # 重置为None，确保状态干净
-            self.region_ocr_pipeline = None
-            
-            # 创建新的pipeline实例
-            self.region_ocr_pipeline = create_pipeline(pipeline="OCR")
-            
-            # 额外的有效性检查，确保pipeline确实被成功创建且可调用
-            if self.region_ocr_pipeline is None or not hasattr(self.region_ocr_pipeline, 'predict'):
-                raise Exception("OCR管道创建失败：pipeline为None或缺少predict方法")
-                
+            self.ocr_engine.load()
             return True
         except Exception as e:
             error_details = f"{type(e).__name__}: {str(e)}"
             print(f"OCR管道初始化错误详情：{error_details}")
             messagebox.showerror("OCR初始化失败",
-                                 f"识别区域管道加载失败：{str(e)}\n建议安装：pip install paddlex==2.0.0 paddlepaddle==2.4.2")
-            self.region_ocr_pipeline = None
+                                 f"OCR管道加载失败：{str(e)}\n建议安装：pip install paddlex==2.0.0 paddlepaddle==2.4.2")
             return False
-    
-    def destroy_region_ocr_pipeline(self):
-        """销毁识别区域OCR管道，释放资源"""
-        try:
-            if self.region_ocr_pipeline is not None:
-                del self.region_ocr_pipeline
-            # 强制设置为None，确保状态一致
-            self.region_ocr_pipeline = None
-        except Exception as e:
-            print(f"销毁识别区域管道：{type(e).__name__}: {str(e)}")
-            # 即使销毁失败，也将引用设为None以允许重新初始化
-            self.region_ocr_pipeline = None
 
-    def init_stop_ocr_pipeline(self):
-        try:
-            self.destroy_stop_ocr_pipeline()
-            
-            # 可选的缓存目录 - 如果不需要缓存可以设为None
-            use_cache = False  # 禁用缓存以避免生成stop_ocr_cache文件夹
-            cache_dir = stop_ocr_cache_dir if use_cache else None
-            
-            # 只有在使用缓存时才创建目录
-            if use_cache:
-                if os.path.exists(stop_ocr_cache_dir):
-                    shutil.rmtree(stop_ocr_cache_dir, ignore_errors=True)
-                os.makedirs(stop_ocr_cache_dir, exist_ok=True)
-
-            self.stop_ocr_pipeline = create_pipeline(
-                pipeline="OCR",
-                cache_dir=cache_dir
-            )
-            return True
-        except Exception as e:
-            messagebox.showerror("停止区域OCR失败", f"管道加载失败：{str(e)}")
-            self.stop_ocr_pipeline = None
-            return False
+    # ------------------------------ 执行状态 ------------------------------
+    @property
+    def is_running(self):
+        """执行状态标记（只读，经由run_control修改）"""
+        return self.run_control.running
 
-    def destroy_stop_ocr_pipeline(self):
-        if self.stop_ocr_pipeline is not None:
-            try:
-                del self.stop_ocr_pipeline
-                self.stop_ocr_pipeline = None
-                # 清理缓存目录
-                if os.path.exists(stop_ocr_cache_dir):
-                    shutil.rmtree(stop_ocr_cache_dir, ignore_errors=True)
-            except Exception as e:
-                print(f"销毁停止区域管道：{str(e)}")
+    @property
+    def is_paused(self):
+        """暂停状态标记（只读，经由run_control修改）"""
+        return self.run_control.paused
+
+    @property
+    def capture_backend(self):
+        return self.executor.capture_backend
+
+    @property
+    def input_backend(self):
+        return self.executor.input_backend
 
     # ------------------------------ 退出程序请求处理 ------------------------------
     def on_exit_request(self):
@@ -292,8 +3296,7 @@ class RealTimeControl:
         
         # 如果程序正在运行，先暂停
         if was_running:
-            self.is_paused = True
-            self.is_running = False
+            self.run_control.pause()
             self.status_var.set("已暂停执行，正在显示确认对话框...")
             self.root.update_idletasks()
         
@@ -316,32 +3319,36 @@ class RealTimeControl:
         else:
             # 如果用户取消，恢复暂停状态
             if was_running:
-                self.is_paused = False
-                self.is_running = True
+                self.run_control.resume()
                 self.status_var.set("已恢复执行")
     
     # ------------------------------ 清理output文件夹 ------------------------------
     def clean_output_folder(self):
-        """清理output文件夹中的所有文件，保留文件夹结构"""
+        """清理output文件夹中本程序生成的临时文件（停止区域基准截图、调试OCR的PNG/JSON）
+
+        输出目录可由--output指定为任意目录，因此只删除可识别的临时文件，不进入子文件夹；
+        阶段耗时导出等其余文件一律保留。
+        """
         try:
-            if os.path.exists(output_dir):
-                # 遍历output文件夹中的所有文件和子文件夹
-                for root_dir, subdirs, files in os.walk(output_dir):
-                    for file in files:
-                        file_path = os.path.join(root_dir, file)
+            if os.path.isdir(output_dir):
+                for file in os.listdir(output_dir):
+                    file_path = os.path.join(output_dir, file)
+                    is_debug_file = file.startswith(DEBUG_FILE_PREFIXES) and file.endswith((".png", "_res.json"))
+                    if not os.path.isfile(file_path) or not (file == STOP_BASE_IMAGE or is_debug_file):
+                        continue
+                    try:
+                        os.remove(file_path)
+                        print(f"已删除文件: {file_path}")
+                    except Exception as e:
+                        # 记录错误但继续执行
+                        error_msg = f"删除文件失败 {file_path}: {str(e)}"
+                        print(error_msg)
+                        # 更新状态提示，但不阻止程序退出
                         try:
-                            os.remove(file_path)
-                            print(f"已删除文件: {file_path}")
-                        except Exception as e:
-                            # 记录错误但继续执行
-                            error_msg = f"删除文件失败 {file_path}: {str(e)}"
-                            print(error_msg)
-                            # 更新状态提示，但不阻止程序退出
-                            try:
-                                self.status_var.set(f"部分文件清理失败: {str(e)}")
-                                self.root.update_idletasks()
-                            except:
-                                pass
+                            self.status_var.set(f"部分文件清理失败: {str(e)}")
+                            self.root.update_idletasks()
+                        except:
+                            pass
                 
                 # 显示清理完成信息
                 try:
@@ -359,7 +3366,7 @@ class RealTimeControl:
         """程序关闭时的资源清理和退出操作"""
         # 停止正在运行的任务
         if self.is_running:
-            self.is_running = False
+            self.run_control.stop()
             time.sleep(0.5)
 
         # 销毁动态按钮窗口
@@ -367,14 +3374,8 @@ class RealTimeControl:
             if elem["type"] == "button" and elem["data"]["window"].winfo_exists():
                 elem["data"]["window"].destroy()
 
-        # 释放OCR资源
-        if self.region_ocr_pipeline is not None:
-            try:
-                del self.region_ocr_pipeline
-            except:
-                pass
-        
-        self.destroy_stop_ocr_pipeline()
+        # 释放OCR资源与截图/输入后端
+        self.executor.close()
 
         # 销毁主窗口并退出程序
         try:
@@ -386,6 +3387,8 @@ class RealTimeControl:
 
     # ------------------------------ 快捷键注册 ------------------------------
     def register_hotkeys(self):
+        import keyboard  # 只有窗口客户端需要全局热键，命令行执行不依赖该模块
+
         def hotkey_listener():
             # 移除可能存在的旧热键，确保没有冲突
             try:
@@ -434,6 +3437,8 @@ class RealTimeControl:
 
     # ------------------------------ UI创建 ------------------------------
     def create_ui(self):
+        defaults = Workflow()  # 各执行参数输入框的默认值
+
         # 标题区域
         title_frame = tk.Frame(self.root)
         title_frame.grid(row=0, column=0, padx=10, pady=5, sticky="ew")
@@ -483,6 +3488,29 @@ class RealTimeControl:
         self.button_interval_entry.pack(side=tk.LEFT, padx=5)
         button_interval_frame.pack(side=tk.LEFT, padx=2, pady=2)
 
+        # 点击后延迟：每次点击后显式等待的时间，默认0（不再有pyautogui的隐式0.1秒暂停）
+        click_delay_frame = tk.Frame(control_frame, padx=5, pady=5)
+        tk.Label(click_delay_frame, text="点击后延迟(毫秒):", height=2).pack(side=tk.LEFT, padx=5)
+        self.click_delay_entry = tk.Entry(click_delay_frame, width=8, font=("Arial", 10))
+        self.click_delay_entry.insert(0, "0")
+        self.click_delay_entry.pack(side=tk.LEFT, padx=5)
+        click_delay_frame.pack(side=tk.LEFT, padx=2, pady=2)
+
+        # 调度策略：间隔按计划开始时间计算，落后于计划时按所选策略处理
+        schedule_frame = tk.Frame(control_frame, padx=5, pady=5)
+        tk.Label(schedule_frame, text="落后时:", height=2).pack(side=tk.LEFT, padx=5)
+        self.schedule_policy_var = tk.StringVar(value="压缩")
+        tk.OptionMenu(schedule_frame, self.schedule_policy_var, *SCHEDULE_POLICIES).pack(side=tk.LEFT, padx=5)
+        schedule_frame.pack(side=tk.LEFT, padx=2, pady=2)
+
+        # 截图后端："自动"为启动自测中最快的后端，各后端耗时见性能状态栏
+        capture_frame = tk.Frame(control_frame, padx=5, pady=5)
+        tk.Label(capture_frame, text="截图方式:", height=2).pack(side=tk.LEFT, padx=5)
+        self.capture_backend_var = tk.StringVar(value="自动")
+        tk.OptionMenu(capture_frame, self.capture_backend_var, "自动", *self.capture_backends,
+                      command=self.on_capture_backend_change).pack(side=tk.LEFT, padx=5)
+        capture_frame.pack(side=tk.LEFT, padx=2, pady=2)
+
         # 循环次数
         loop_frame = tk.Frame(control_frame, padx=5, pady=5)
         tk.Label(loop_frame, text="全局循环次数:", height=2).pack(side=tk.LEFT, padx=5)
@@ -503,6 +3531,65 @@ class RealTimeControl:
         self.y_offset_entry.pack(side=tk.LEFT, padx=2)
         offset_frame.pack(side=tk.LEFT, padx=2, pady=2)
 
+        # 批量OCR：停止校验时所有区域合并为一次predict调用
+        batch_frame = tk.Frame(control_frame, padx=5, pady=5)
+        tk.Label(batch_frame, text="OCR批大小:", height=2).pack(side=tk.LEFT, padx=5)
+        self.ocr_batch_entry = tk.Entry(batch_frame, width=5, font=("Arial", 10))
+        self.ocr_batch_entry.insert(0, str(defaults.ocr_batch_size))
+        self.ocr_batch_entry.pack(side=tk.LEFT, padx=5)
+        batch_frame.pack(side=tk.LEFT, padx=2, pady=2)
+
+        # 观测有效期：窗口内停止校验与区域识别共用同一份截图和OCR结果
+        freshness_frame = tk.Frame(control_frame, padx=5, pady=5)
+        tk.Label(freshness_frame, text="识别结果有效期(毫秒):", height=2).pack(side=tk.LEFT, padx=5)
+        self.observation_age_entry = tk.Entry(freshness_frame, width=6, font=("Arial", 10))
+        self.observation_age_entry.insert(0, str(int(defaults.observation_max_age * 1000)))
+        self.observation_age_entry.pack(side=tk.LEFT, padx=5)
+        freshness_frame.pack(side=tk.LEFT, padx=2, pady=2)
+
+        # 多进程OCR：进程数为0时在本进程内识别
+        worker_frame = tk.Frame(control_frame, padx=5, pady=5)
+        tk.Label(worker_frame, text="OCR进程数/每进程线程:", height=2).pack(side=tk.LEFT, padx=5)
+        self.ocr_workers_entry = tk.Entry(worker_frame, width=4, font=("Arial", 10))
+        self.ocr_workers_entry.insert(0, str(defaults.ocr_worker_count))
+        self.ocr_workers_entry.pack(side=tk.LEFT, padx=2)
+        self.ocr_threads_entry = tk.Entry(worker_frame, width=4, font=("Arial", 10))
+        self.ocr_threads_entry.insert(0, str(defaults.ocr_worker_threads))
+        self.ocr_threads_entry.pack(side=tk.LEFT, padx=2)
+        worker_frame.pack(side=tk.LEFT, padx=2, pady=2)
+
+        # 停止条件后台监视周期，0表示每个元素执行前同步校验
+        watch_frame = tk.Frame(control_frame, padx=5, pady=5)
+        tk.Label(watch_frame, text="停止检测周期(毫秒):", height=2).pack(side=tk.LEFT, padx=5)
+        self.stop_watch_entry = tk.Entry(watch_frame, width=6, font=("Arial", 10))
+        self.stop_watch_entry.insert(0, str(int(defaults.stop_watch_period * 1000)))
+        self.stop_watch_entry.pack(side=tk.LEFT, padx=5)
+        watch_frame.pack(side=tk.LEFT, padx=2, pady=2)
+
+        # 流水线模式：下一区域的截图/OCR与当前元素的点击重叠执行
+        pipeline_frame = tk.Frame(control_frame, padx=5, pady=5)
+        self.pipeline_mode_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(
+            pipeline_frame, text="流水线模式（预取下一区域）", variable=self.pipeline_mode_var, height=2
+        ).pack(side=tk.LEFT, padx=5)
+        pipeline_frame.pack(side=tk.LEFT, padx=2, pady=2)
+
+        # 模板预筛：目标上次被识别时的截图片段作模板，明确不在画面中时跳过整次OCR
+        template_frame = tk.Frame(control_frame, padx=5, pady=5)
+        self.template_prefilter_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(
+            template_frame, text="OCR前模板预筛", variable=self.template_prefilter_var, height=2
+        ).pack(side=tk.LEFT, padx=5)
+        template_frame.pack(side=tk.LEFT, padx=2, pady=2)
+
+        # 调试模式：沿用截图落盘方式并保留PNG，便于排查识别问题
+        debug_frame = tk.Frame(control_frame, padx=5, pady=5)
+        self.debug_ocr_files_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(
+            debug_frame, text="调试：保留OCR截图文件", variable=self.debug_ocr_files_var, height=2
+        ).pack(side=tk.LEFT, padx=5)
+        debug_frame.pack(side=tk.LEFT, padx=2, pady=2)
+
         # 停止条件区域
         stop_frame = FlowFrame(self.root, min_height=80)
         stop_frame.grid(row=2, column=0, padx=20, pady=5, sticky="ew")
@@ -558,6 +3645,11 @@ class RealTimeControl:
             width=button_width, font=button_font, height=1, padx=5, pady=3
         ).pack(side=tk.LEFT, padx=5, pady=5)
 
+        tk.Button(
+            self.btn_frame, text="添加图片元素", command=self.add_image_element,
+            width=button_width, font=button_font, height=1, padx=5, pady=3
+        ).pack(side=tk.LEFT, padx=5, pady=5)
+
         tk.Button(
             self.btn_frame, text="删除按钮", fg="red", command=self.delete_button_by_id,
             width=10, font=button_font, height=1, padx=5, pady=3
@@ -573,6 +3665,11 @@ class RealTimeControl:
             width=12, font=button_font, height=1, padx=5, pady=3
         ).pack(side=tk.LEFT, padx=5, pady=5)
 
+        tk.Button(
+            self.btn_frame, text="导出配置", command=self.export_workflow,
+            width=10, font=button_font, height=1, padx=5, pady=3
+        ).pack(side=tk.LEFT, padx=5, pady=5)
+
         self.execute_btn = tk.Button(
             self.btn_frame, text="按ID顺序执行 (F8)", bg="#4CAF50", fg="white",
             width=button_width, font=button_font, height=1, padx=5, pady=3,
@@ -616,23 +3713,6 @@ class RealTimeControl:
         # 初始化状态标签
         self.init_status_label()
 
-    # ------------------------------ 辅助方法：获取嵌套字典值 ------------------------------
-    def get_nested_value(self, data, key_path):
-        """从嵌套字典中获取值，支持点分隔的路径"""
-        if data is None:
-            return None
-        
-        keys = key_path.split('.')
-        value = data
-        
-        for key in keys:
-            if isinstance(value, dict) and key in value:
-                value = value[key]
-            else:
-                return None
-        
-        return value
-
     # ------------------------------ 状态提示初始化 ------------------------------
     def init_status_label(self):
         # 设置初始状态文本
@@ -644,8 +3724,38 @@ class RealTimeControl:
         )
         self.status_label.grid(row=5, column=0, padx=20, pady=10, sticky="w")
 
+        # 性能状态栏：OCR缓存命中情况等
+        self.perf_var = tk.StringVar()
+        self.perf_notes = {"cache": self.ocr_cache.summary()}
+        self.perf_var.set(self.ocr_cache.summary())
+        self.perf_label = tk.Label(
+            self.root, textvariable=self.perf_var, fg="gray", justify="left", font=("Arial", 9)
+        )
+        self.perf_label.grid(row=6, column=0, padx=20, pady=(0, 10), sticky="w")
+
+        # 阶段耗时面板：各区域/按钮按阶段的p50/p95/p99，运行中每秒刷新
+        stage_frame = tk.LabelFrame(self.root, text="阶段耗时（按累计耗时排序）", fg="gray")
+        stage_frame.grid(row=7, column=0, padx=20, pady=(0, 10), sticky="ew")
+        self.stage_var = tk.StringVar(value=self.stage_stats.summary())
+        tk.Label(
+            stage_frame, textvariable=self.stage_var, fg="gray", justify="left", anchor="w", font=("Consolas", 9)
+        ).pack(fill=tk.X, padx=5, pady=2)
+        self._refresh_stage_panel()
+
         self.root.bind("<Escape>", self.global_escape_handler)
 
+    def _refresh_stage_panel(self):
+        """运行中每秒刷新阶段耗时面板"""
+        if self.is_running:
+            self.stage_var.set(self.stage_stats.summary())
+        self.root.after(1000, self._refresh_stage_panel)
+
+    def _update_perf_status(self, key, text):
+        """更新性能状态栏中的一项（可在工作线程中调用）"""
+        self.perf_notes[key] = text
+        summary = " | ".join(list(self.perf_notes.values()))
+        self.root.after(0, lambda: self.perf_var.set(summary))
+
     # ------------------------------ 全局ESC处理 ------------------------------
     def global_escape_handler(self, event):
         if (self.active_select_window is not None
@@ -715,34 +3825,26 @@ class RealTimeControl:
         
         # 如果程序正在运行，先暂停
         if was_running:
-            self.is_paused = True
-            self.is_running = False
+            self.run_control.pause()
             self.status_var.set("已暂停执行，正在显示确认对话框...")
             self.root.update_idletasks()
         
         # 显示确认对话框
         if messagebox.askyesno("确认停止", "确定要停止当前循环吗？"):
-            # 确认停止，重置所有状态
-            self.is_paused = False
-            self.is_running = False
+            # 确认停止，重置所有状态（正在等待的执行线程会被立即唤醒）
+            self.run_control.stop()
             self.status_var.set("已收到停止命令，正在中断循环...")
             self.root.update()
             
-            # 主动触发资源释放
+            # 恢复界面状态（OCR引擎保持常驻，供下次运行直接使用）
             def cleanup_and_notify():
                 try:
-                    # 立即释放OCR资源
-                    if self.region_ocr_pipeline is not None:
-                        self.root.after(0, lambda: self.status_var.set("正在释放OCR资源..."))
-                        self.destroy_region_ocr_pipeline()
-                        self.destroy_stop_ocr_pipeline()
-                    
                     # 恢复按钮状态和UI显示
                     self.execute_btn.config(state=tk.NORMAL)
                     self.toggle_buttons_visibility(True)
                     
                     # 显示中断完成消息
-                    self.status_var.set("循环已成功中断并清理资源")
+                    self.status_var.set("循环已成功中断")
                 except Exception as e:
                     self.status_var.set(f"循环中断过程中发生错误: {str(e)}")
             
@@ -751,8 +3853,7 @@ class RealTimeControl:
         else:
             # 如果用户取消，恢复暂停状态
             if was_running:
-                self.is_paused = False
-                self.is_running = True
+                self.run_control.resume()
                 self.status_var.set("已恢复执行")
 
     # ------------------------------ 滚动区域配置 ------------------------------
@@ -947,8 +4048,9 @@ class RealTimeControl:
 
             self.stop_condition["coords"] = (x1, y1, x2 - x1, y2 - y1)
             try:
-                screenshot = ImageGrab.grab(bbox=(x1, y1, x2, y2))
-                screenshot.save(self.stop_condition["base_img_path"])
+                snapshot = self.capture_backend.grab((x1, y1, x2, y2))
+                ensure_output_dir()
+                Image.fromarray(np.ascontiguousarray(snapshot[:, :, ::-1])).save(self.stop_condition["base_img_path"])
                 if not os.path.exists(self.stop_condition["base_img_path"]):
                     raise Exception(f"截图保存失败，路径：{self.stop_condition['base_img_path']}")
             except Exception as err:
@@ -973,19 +4075,20 @@ class RealTimeControl:
         if not elem:
             return
         data = elem["data"]
+        is_image = elem["type"] == "image"  # 图片元素复用同一框选界面，框选内容即为模板
+        type_name = ELEMENT_TYPE_NAMES[elem["type"]]
         
         # 确保status_var已初始化
         if not hasattr(self, 'status_var'):
             self.status_var = tk.StringVar()
         
-        # 确保OCR管道已初始化（延迟初始化策略）
-        if self.region_ocr_pipeline is None or not hasattr(self.region_ocr_pipeline, 'predict'):
-            if not self.init_region_ocr_pipeline():
-                self.root.after(0, lambda: self.status_var.set("OCR管道初始化失败，无法选择区域"))
-                return
+        # 确保OCR引擎已加载（已加载时不会重复加载）；图片元素不依赖OCR
+        if not is_image and not self.init_ocr_engine():
+            self.root.after(0, lambda: self.status_var.set("OCR管道初始化失败，无法选择区域"))
+            return
 
         self.toggle_buttons_visibility(False)
-        self.status_var.set(f"绘制识别区域 {data['current_id']}（按ESC退出）...")
+        self.status_var.set(f"绘制{type_name} {data['current_id']}（按ESC退出）...")
         self.root.iconify()
         time.sleep(0.3)
 
@@ -1005,7 +4108,7 @@ class RealTimeControl:
 
         self.active_select_window = main_win
         self.border_win = border_win
-        self.select_window_type = f"识别区域 {data['current_id']}"
+        self.select_window_type = f"{type_name} {data['current_id']}"
 
         def on_close():
             if main_win.winfo_exists():
@@ -1048,7 +4151,8 @@ class RealTimeControl:
         )
         guide_text = main_canvas.create_text(
             screen_width // 2, screen_height // 4 + 50,
-            text=f"按住鼠标左键拖动绘制识别区域 {data['current_id']}（实时识别）",
+            text=(f"按住鼠标左键框选图片元素 {data['current_id']} 的模板图像" if is_image
+                  else f"按住鼠标左键拖动绘制识别区域 {data['current_id']}（实时识别）"),
             font=("Arial", 14),
             fill="#FFFFFF"
         )
@@ -1088,6 +4192,20 @@ class RealTimeControl:
             # 保存到指定路径
             data["coords"] = (x1, y1, x2 - x1, y2 - y1)  # (x1, y1, w, h) 屏幕坐标
 
+            if is_image:
+                # 截取框选内容作为灰度模板
+                try:
+                    snapshot = self.capture_backend.grab((x1, y1, x2, y2))
+                    data["template"] = cv2.cvtColor(snapshot, cv2.COLOR_BGR2GRAY)
+                except Exception as grab_err:
+                    messagebox.showerror("截取失败", f"无法截取模板图像：{str(grab_err)}")
+                    on_close()
+                    return
+                data["status_var"].set(f"已截取模板（{x2 - x1}×{y2 - y1}）")
+                data["status_label"]["fg"] = "blue"
+                on_close()
+                return
+
             # 更新状态
             data["status_label"]["text"] = f"已选择区域（实时识别）"
             data["status_label"]["fg"] = "blue"
@@ -1099,268 +4217,108 @@ class RealTimeControl:
         main_win.focus_force()
         main_win.mainloop()
 
-    # ------------------------------ 嵌套字段解析 ------------------------------
-    def get_nested_value(self, data, field_path):
-        fields = field_path.split('.')
-        current = data
-        for field in fields:
-            if isinstance(current, dict) and field in current:
-                current = current[field]
-            else:
-                return None
-        return current
-
-    # ------------------------------ 停止条件校验 ------------------------------
-    def check_stop_condition(self):
-        if not self.is_running:
-            return True
-
-        target_text = self.stop_text_entry.get().strip()
-        if not target_text:
-            self.root.after(0, lambda: self.status_var.set("警告：未输入目标停止文本，继续执行..."))
-            return False
-
-        # 强制重新初始化OCR管道（避免状态残留）
-        self.destroy_stop_ocr_pipeline()
-
-        # 校验1：停止区域文本匹配（优先检查）
-        stop_region_match = self._check_stop_region_match(target_text)
-        if stop_region_match:
-            return True
-
-        # 校验2：识别区域文本匹配（任一区域匹配则停止）
-        region_match = self._check_any_region_match(target_text)
-        return region_match
-
-    def _check_stop_region_match(self, target_text):
-        if not self.stop_condition["is_set"]:
-            return False
+    # ------------------------------ 截图后端切换 ------------------------------
+    def on_capture_backend_change(self, choice):
+        """界面切换截图后端："自动"回到启动自测中最快的后端"""
+        name = self.capture_best if choice == "自动" else choice
+        if name in self.capture_backends:
+            self.executor.set_capture_backend(self.capture_backends[name])
 
-        try:
-            x1, y1, w, h = self.stop_condition["coords"]
-            x2, y2 = x1 + w, y1 + h
-
-            # 生成唯一临时文件名（避免多轮循环文件冲突）
-            timestamp = int(time.time() * 1000000)  # 精确到微秒
-            temp_img = os.path.join(output_dir, f"stop_current_{timestamp}.png")
-
-            # 确保截图成功
-            try:
-                current_screenshot = ImageGrab.grab(bbox=(x1, y1, x2, y2))
-                current_screenshot.save(temp_img)
-                if not os.path.exists(temp_img):
-                    raise Exception(f"截图文件未生成：{temp_img}")
-            except Exception as img_err:
-                self.root.after(0, lambda: self.status_var.set(f"停止区域截图失败：{str(img_err)}"))
-                return False
-
-            # 使用常驻OCR管道，避免每次检查都重新初始化
-            if self.stop_ocr_pipeline is None or not hasattr(self.stop_ocr_pipeline, 'predict'):
-                if not self.init_stop_ocr_pipeline():
-                    if os.path.exists(temp_img):
-                        os.remove(temp_img)
-                    return False
+    # ------------------------------ 添加识别区域 ------------------------------
+    def add_region(self):
+        if self.is_running:
+            messagebox.showinfo("提示", "运行中无法添加区域")
+            return
 
-            # 执行OCR识别
-            output = list(self.stop_ocr_pipeline.predict([temp_img]))
-            if not output:
-                self.destroy_stop_ocr_pipeline()
-                os.remove(temp_img)
-                return False
+        # 移除添加时就初始化OCR管道的操作，延迟到实际需要时（选择区域或运行时）再初始化
 
-            # 初始化json_path变量
-            json_path = None
-            
-            # 保存并解析结果
-            json_path = f"{os.path.splitext(temp_img)[0]}_res.json"
-            output[0].save_to_json(json_path)
-            time.sleep(0.1)  # 确保文件写入完成
+        original_index = len(self.elements)
+        initial_id = original_index + 1
 
-            if not os.path.exists(json_path):
-                raise Exception(f"OCR结果JSON未生成：{json_path}")
+        # 使用自定义ElementFrame解决布局问题
+        frame = ElementFrame(self.regions_frame, bd=2, relief=tk.GROOVE, padx=10, pady=5)
+        frame.pack(fill=tk.X, padx=5, pady=5)
 
-            # 解析文本
-            user_fields = [f.strip() for f in self.ocr_fields_entry.get().split(',') if f.strip()] or \
-                          self.stop_condition["ocr_text_fields"]
-            ocr_texts = []
+        # 调整列权重，让状态列可以伸缩
+        frame.grid_columnconfigure(1, weight=1)
 
-            with open(json_path, "r", encoding="utf-8") as f:
-                ocr_data = json.load(f)
+        id_label = tk.Label(
+            frame,
+            text=f"识别区域 {initial_id}",
+            font=("Arial", 10, "bold"),
+            width=15,
+            anchor="w"
+        )
+        id_label.grid(row=0, column=0, padx=5, pady=5, sticky="w")
 
-            for field in user_fields:
-                value = self.get_nested_value(ocr_data, field)
-                if value is None:
-                    continue
-                if isinstance(value, list):
-                    ocr_texts.extend([str(t).strip() for t in value if str(t).strip()])
-                elif isinstance(value, str):
-                    ocr_texts.append(value.strip())
-                break  # 取第一个有效字段
-
-            # 强制清理临时文件
-            for f in [temp_img, json_path]:
-                if os.path.exists(f):
-                    try:
-                        os.remove(f)
-                    except Exception as del_err:
-                        self.root.after(0, lambda: self.status_var.set(f"临时文件清理警告：{str(del_err)}"))
-
-            # 保持停止区域OCR管道常驻，避免频繁创建和销毁
-            # 管道将在程序退出时统一销毁
-
-            # 归一化匹配
-            def normalize(s):
-                s = s.replace('０', '0').replace('１', '1').replace('２', '2').replace('３', '3').replace('４', '4')
-                s = s.replace('５', '5').replace('６', '6').replace('７', '7').replace('８', '8').replace('９', '9')
-                s = s.replace('Ａ', 'A').replace('Ｂ', 'B').lower().strip()
-                return s
-
-            target_norm = normalize(target_text)
-            match = any(normalize(t) == target_norm for t in ocr_texts)
-            if match:
-                self.root.after(0, lambda: self.status_var.set(
-                    f"停止区域匹配成功：识别到「{ocr_texts}」=目标「{target_text}」"))
-            return match
+        status_var = tk.StringVar()
+        status_var.set("未选择区域")
+        status_label = tk.Label(
+            frame,
+            textvariable=status_var,
+            fg="orange",
+            wraplength=300,  # 自动换行
+            justify="left",
+            anchor="w"
+        )
+        status_label.grid(row=0, column=1, padx=5, pady=5, sticky="ew")
 
-        except Exception as err:
-            self.root.after(0, lambda: self.status_var.set(f"停止区域校验出错：{str(err)}，继续执行..."))
-            self.destroy_stop_ocr_pipeline()
-            return False
+        tk.Label(frame, text="目标匹配文本:", width=12, anchor="e").grid(row=0, column=2, padx=5, pady=5, sticky="e")
+        target_entry = tk.Entry(frame, width=15, font=("Arial", 10))
+        target_entry.grid(row=0, column=3, padx=5, pady=5)
 
-    def _check_any_region_match(self, target_text):
-        regions = [e for e in self.elements if e["type"] == "region"]
-        if not regions:
-            return False
+        # 容错：整数为最大编辑距离，0~1小数为最低相似度，留空为精确匹配
+        tk.Label(frame, text="容错:", anchor="e").grid(row=0, column=4, padx=2, pady=5, sticky="e")
+        tolerance_entry = tk.Entry(frame, width=5, font=("Arial", 10))
+        tolerance_entry.grid(row=0, column=5, padx=2, pady=5)
 
-        for region in regions:
-            data = region["data"]
-            if not data["coords"]:
-                continue
+        # 等待：未匹配时持续轮询直至目标出现，超过该秒数放弃；0为不等待
+        tk.Label(frame, text="等待(秒):", anchor="e").grid(row=0, column=6, padx=2, pady=5, sticky="e")
+        wait_entry = tk.Entry(frame, width=5, font=("Arial", 10))
+        wait_entry.insert(0, "0")
+        wait_entry.grid(row=0, column=7, padx=2, pady=5)
 
-            # 预初始化变量，避免作用域问题
-            temp_img = None
-            json_path = None
-            temp_files = []
-            
-            try:
-                # 实时OCR识别
-                x1, y1, w, h = data["coords"]
-                x2, y2 = x1 + w, y1 + h
-
-                # 生成唯一临时文件名
-                timestamp = int(time.time() * 1000000)
-                temp_img = os.path.join(output_dir, f"region_current_{timestamp}.png")
-                temp_files.append(temp_img)  # 立即添加到清理列表
-                
-                try:
-                    # 截图
-                    try:
-                        current_screenshot = ImageGrab.grab(bbox=(x1, y1, x2, y2))
-                        current_screenshot.save(temp_img)
-                        # 增加文件写入完成确认
-                        for _ in range(3):
-                            if os.path.exists(temp_img) and os.path.getsize(temp_img) > 0:
-                                break
-                            time.sleep(0.05)
-                        
-                        if not os.path.exists(temp_img):
-                            raise Exception(f"截图文件未生成：{temp_img}")
-                    except Exception as img_err:
-                        raise Exception(f"截图失败：{type(img_err).__name__}: {str(img_err)}")
+        select_btn = tk.Button(
+            frame,
+            text="选择区域",
+            command=lambda: self.select_region(original_index)
+        )
+        select_btn.grid(row=0, column=8, padx=5, pady=5)
 
-                    # 执行OCR识别
-                    try:
-                        output = list(self.region_ocr_pipeline.predict([temp_img]))
-                        if not output:
-                            raise Exception("OCR未识别到内容")
-                    except Exception as ocr_err:
-                        raise Exception(f"OCR识别失败：{type(ocr_err).__name__}: {str(ocr_err)}")
-
-                    # 保存并解析结果
-                    json_path = f"{os.path.splitext(temp_img)[0]}_res.json"
-                    temp_files.append(json_path)  # 添加到清理列表
-                    
-                    try:
-                        output[0].save_to_json(json_path)
-                        # 增加文件写入完成确认
-                        for _ in range(3):
-                            if os.path.exists(json_path) and os.path.getsize(json_path) > 0:
-                                break
-                            time.sleep(0.05)
-
-                        if not os.path.exists(json_path):
-                            raise Exception(f"OCR结果JSON未生成：{json_path}")
-                    except Exception as json_err:
-                        raise Exception(f"JSON保存失败：{type(json_err).__name__}: {str(json_err)}")
-
-                    # 解析文本
-                    try:
-                        with open(json_path, "r", encoding="utf-8") as f:
-                            ocr_data = json.load(f)
-                    except Exception as parse_err:
-                        raise Exception(f"JSON解析失败：{type(parse_err).__name__}: {str(parse_err)}")
-
-                    user_fields = [f.strip() for f in self.ocr_fields_entry.get().split(',') if f.strip()] or \
-                                  self.stop_condition["ocr_text_fields"]
-                    ocr_texts = []
-
-                    for field in user_fields:
-                        value = self.get_nested_value(ocr_data, field)
-                        if value is None:
-                            continue
-                        if isinstance(value, list):
-                            ocr_texts.extend([str(t).strip() for t in value if str(t).strip()])
-                        elif isinstance(value, str):
-                            ocr_texts.append(value.strip())
-                        break
-
-                    def normalize(s):
-                        s = s.replace('０', '0').replace('１', '1').replace('２', '2').replace('３', '3').replace('４', '4')
-                        s = s.replace('５', '5').replace('６', '6').replace('７', '7').replace('８', '8').replace('９', '9')
-                        s = s.replace('Ａ', 'A').replace('Ｂ', 'B').lower()
-                        return s.strip()
-
-                    target_norm = normalize(target_text)
-                    if any(normalize(t) == target_norm for t in ocr_texts):
-                        # 使用参数传递变量，避免作用域问题
-                        self.root.after(0, lambda data=data, texts=ocr_texts, target=target_text: 
-                            self.status_var.set(
-                                f"识别区域{data['current_id']}匹配成功：识别到「{texts}」=目标「{target}」"
-                            )
-                        )
-                        return True
-                finally:
-                    # 安全清理临时文件 - 无论执行路径如何都确保清理
-                    for f in temp_files:
-                        if f and isinstance(f, str) and os.path.exists(f):
-                            try:
-                                os.remove(f)
-                            except Exception:
-                                # 静默忽略清理失败，避免干扰主流程
-                                pass
-                    # 清空临时文件列表
-                    temp_files.clear()
+        delete_btn = tk.Button(
+            frame,
+            text="删除",
+            fg="red",
+            command=lambda: self.delete_element(original_index)
+        )
+        delete_btn.grid(row=0, column=9, padx=5, pady=5)
 
-            except Exception as err:
-                error_type = type(err).__name__
-                error_message = f"{error_type}: {str(err)}"
-                region_id = data['current_id']
-                # 使用参数传递变量，确保正确捕获异常信息
-                self.root.after(0, lambda msg=error_message, rid=region_id: 
-                    self.status_var.set(f"识别区域{rid}校验出错：{msg}，继续执行...")
-                )
-                continue
+        self.elements.append({
+            "type": "region",
+            "original_index": original_index,
+            "data": {
+                "current_id": initial_id,
+                "frame": frame,
+                "id_label": id_label,
+                "status_var": status_var,
+                "status_label": status_label,
+                "target_entry": target_entry,
+                "tolerance_entry": tolerance_entry,
+                "wait_entry": wait_entry,
+                "coords": None
+            }
+        })
 
-        return False
+        self.regions_frame.update_idletasks()
+        self.canvas.configure(scrollregion=self.canvas.bbox("all"))
+        self.status_var.set(f"已添加识别区域 {initial_id}")
 
-    # ------------------------------ 添加识别区域 ------------------------------
-    def add_region(self):
+    # ------------------------------ 添加图片元素 ------------------------------
+    def add_image_element(self):
         if self.is_running:
-            messagebox.showinfo("提示", "运行中无法添加区域")
+            messagebox.showinfo("提示", "运行中无法添加图片元素")
             return
 
-        # 移除添加时就初始化OCR管道的操作，延迟到实际需要时（选择区域或运行时）再初始化
-
         original_index = len(self.elements)
         initial_id = original_index + 1
 
@@ -1373,7 +4331,7 @@ class RealTimeControl:
 
         id_label = tk.Label(
             frame,
-            text=f"识别区域 {initial_id}",
+            text=f"图片元素 {initial_id}",
             font=("Arial", 10, "bold"),
             width=15,
             anchor="w"
@@ -1381,7 +4339,7 @@ class RealTimeControl:
         id_label.grid(row=0, column=0, padx=5, pady=5, sticky="w")
 
         status_var = tk.StringVar()
-        status_var.set("未选择区域")
+        status_var.set("未截取模板")
         status_label = tk.Label(
             frame,
             textvariable=status_var,
@@ -1392,13 +4350,14 @@ class RealTimeControl:
         )
         status_label.grid(row=0, column=1, padx=5, pady=5, sticky="ew")
 
-        tk.Label(frame, text="目标匹配文本:", width=12, anchor="e").grid(row=0, column=2, padx=5, pady=5, sticky="e")
-        target_entry = tk.Entry(frame, width=15, font=("Arial", 10))
-        target_entry.grid(row=0, column=3, padx=5, pady=5)
+        tk.Label(frame, text="匹配阈值:", width=12, anchor="e").grid(row=0, column=2, padx=5, pady=5, sticky="e")
+        threshold_entry = tk.Entry(frame, width=6, font=("Arial", 10))
+        threshold_entry.insert(0, str(IMAGE_MATCH_THRESHOLD))
+        threshold_entry.grid(row=0, column=3, padx=5, pady=5)
 
         select_btn = tk.Button(
             frame,
-            text="选择区域",
+            text="框选图片",
             command=lambda: self.select_region(original_index)
         )
         select_btn.grid(row=0, column=4, padx=5, pady=5)
@@ -1412,7 +4371,7 @@ class RealTimeControl:
         delete_btn.grid(row=0, column=5, padx=5, pady=5)
 
         self.elements.append({
-            "type": "region",
+            "type": "image",
             "original_index": original_index,
             "data": {
                 "current_id": initial_id,
@@ -1420,14 +4379,15 @@ class RealTimeControl:
                 "id_label": id_label,
                 "status_var": status_var,
                 "status_label": status_label,
-                "target_entry": target_entry,
-                "coords": None
+                "threshold_entry": threshold_entry,
+                "coords": None,
+                "template": None
             }
         })
 
         self.regions_frame.update_idletasks()
         self.canvas.configure(scrollregion=self.canvas.bbox("all"))
-        self.status_var.set(f"已添加识别区域 {initial_id}")
+        self.status_var.set(f"已添加图片元素 {initial_id}")
 
     # ------------------------------ 添加动态按钮 ------------------------------
     def add_dynamic_button(self):
@@ -1607,7 +4567,7 @@ class RealTimeControl:
         for i, e in enumerate(self.elements):
             new_id = i + 1
             e["data"]["current_id"] = new_id
-            e["data"]["id_label"]["text"] = f"{'识别区域' if e['type'] == 'region' else '点击按钮'} {new_id}"
+            e["data"]["id_label"]["text"] = f"{ELEMENT_TYPE_NAMES[e['type']]} {new_id}"
             if e["type"] == "button":
                 # 使用中文数字标记或直接使用数字（当超过10个时）
                 if new_id <= len(self.number_marks):
@@ -1649,341 +4609,214 @@ class RealTimeControl:
         self.delete_element(target_elem["original_index"])
 
     # ------------------------------ 执行逻辑 ------------------------------
-    def run_sequentially(self):
-        if self.is_running:
-            messagebox.showinfo("提示", "已有任务在运行中")
-            return
-
-        if not self.init_region_ocr_pipeline():
-            messagebox.showerror("初始化失败", "识别区域OCR管道未初始化")
-            return
-
-        # 验证输入
+    @staticmethod
+    def _entry_value(entry, convert, message):
+        """读取输入框并转换类型，无法转换时抛出带提示的ValueError"""
         try:
-            loop_count = int(self.loop_count_entry.get())
-            if loop_count < 1:
-                raise ValueError("循环次数必须大于0")
+            return convert(entry.get().strip())
         except ValueError:
-            messagebox.showerror("输入错误", "请输入有效的循环次数（正整数）")
-            return
+            raise ValueError(message)
 
+    @staticmethod
+    def _entry_number(entry):
+        """元素级数值：能转换时取数值，否则原样保留，由执行核心在该元素状态中提示"""
+        text = entry.get().strip()
         try:
-            interval = float(self.interval_entry.get())  # 元素间间隔（用于识别区域）
-            if interval < 0:
-                raise ValueError("元素间间隔不能为负数")
+            return float(text)
         except ValueError:
-            messagebox.showerror("输入错误", "请输入有效的元素间间隔（非负数）")
-            return
+            return text
+
+    def collect_workflow(self):
+        """把界面上的元素与执行参数收集为Workflow（毫秒输入换算为秒），输入无效时抛出ValueError"""
+        elements = []
+        for elem in sorted(self.elements, key=lambda x: x["data"]["current_id"]):
+            data = elem["data"]
+            spec = {"type": elem["type"], "id": data["current_id"]}
+            if elem["type"] == "region":
+                spec.update({"coords": data["coords"], "target": data["target_entry"].get().strip(),
+                             "tolerance": data["tolerance_entry"].get().strip(),
+                             "wait": self._entry_number(data["wait_entry"])})
+            elif elem["type"] == "image":
+                spec.update({"coords": data["coords"], "template": data["template"],
+                             "threshold": self._entry_number(data["threshold_entry"])})
+            else:
+                spec.update({"x": data["x"], "y": data["y"], "width": data["width"], "height": data["height"]})
+            elements.append(spec)
 
         try:
-            button_interval = float(self.button_interval_entry.get())  # 按钮间间隔
-            if button_interval < 0:
-                raise ValueError("按钮间间隔不能为负数")
+            x_offset = int(self.x_offset_entry.get())
+            y_offset = int(self.y_offset_entry.get())
         except ValueError:
-            messagebox.showerror("输入错误", "请输入有效的按钮间间隔（非负数）")
-            return
-
-        self.toggle_buttons_visibility(False)
-        self.is_running = True
-        self.execute_btn.config(state=tk.DISABLED)
-        self.root.after(0, lambda: self.status_var.set(f"开始执行，总循环次数：{loop_count}"))
-
-        def execute():
-            try:
-                total_loops = 0
-                while total_loops < loop_count and (self.is_running or self.is_paused):
-                    # 检查暂停状态
-                    while self.is_paused:
-                        time.sleep(0.1)  # 暂停时短暂休眠，避免CPU占用过高
-                        if not (self.is_running or self.is_paused):
-                            return  # 如果彻底停止，则退出
-                    
-                    # 每轮循环开始前检查停止条件
-                    if self.check_stop_condition():
-                        self.root.after(0, lambda: self.status_var.set("停止条件满足，终止执行"))
-                        self.is_running = False
-                        return
-
-                    total_loops += 1
-                    self.root.after(0, lambda: self.status_var.set(
-                        f"正在执行第 {total_loops}/{loop_count} 轮循环"
-                    ))
-
-                    # 按ID顺序执行所有元素（区分间隔类型）
-                    for elem in sorted(self.elements, key=lambda x: x["data"]["current_id"]):
-                        # 检查暂停状态
-                        while self.is_paused:
-                            time.sleep(0.1)  # 暂停时短暂休眠，避免CPU占用过高
-                            if not (self.is_running or self.is_paused):
-                                return  # 如果彻底停止，则退出
-                        
-                        # 执行前检查停止条件（保留）
-                        if not self.is_running or self.check_stop_condition():
-                            self.root.after(0, lambda: self.status_var.set("停止条件满足，终止执行"))
-                            self.is_running = False
-                            return
-
-                        # 执行元素操作
-                        if elem["type"] == "region":
-                            self.process_region(elem)
-                        elif elem["type"] == "button":
-                            self.process_button(elem)
-
-                        # 移除执行后的重复检查，减少OCR调用频率
-                        # 移除不必要的0.1秒延迟
-                        
-                        # 根据元素类型选择间隔时间
-                        if elem["type"] == "button":
-                            time.sleep(button_interval)  # 按钮使用按钮间间隔
-                        else:
-                            time.sleep(interval)  # 识别区域使用元素间间隔
-
-                    # 一轮循环结束后检查停止条件（保留）
-                    # 这已经是下一轮循环前的再次检查，不需要重复检查
-
-                # 所有循环完成
-                self.root.after(0, lambda: self.status_var.set(
-                    f"所有 {loop_count} 轮循环执行完成"
-                ))
-            except Exception as e:
-                error_details = f"{type(e).__name__}: {str(e)}"
-                self.root.after(0, lambda: self.status_var.set(f"执行出错：{error_details}"))
-            finally:
-                # 只有在非暂停状态下才重置运行状态和清理资源
-                if not self.is_paused:
-                    self.is_running = False
-                    
-                    def finalize_execution():
-                        try:
-                            # 更新UI状态
-                            self.execute_btn.config(state=tk.NORMAL)
-                            self.toggle_buttons_visibility(True)
-                            
-                            # 释放OCR资源
-                            self.root.after(0, lambda: self.status_var.set("正在释放资源..."))
-                            self.destroy_stop_ocr_pipeline()
-                            self.destroy_region_ocr_pipeline()
-                            
-                            # 检查是否是正常完成还是被中断
-                            if 'total_loops' in locals() and total_loops >= loop_count:
-                                self.status_var.set("所有循环已成功完成")
-                            else:
-                                self.status_var.set("循环已成功中断")
-                        except Exception as e:
-                            self.status_var.set(f"资源清理过程中发生错误: {str(e)}")
-                    
-                    # 使用UI线程执行最终清理操作
-                    self.root.after(0, finalize_execution)
-
-        threading.Thread(target=execute, daemon=True).start()
+            x_offset = y_offset = 0
+        worker_message = "请输入有效的OCR进程数（非负整数）和每进程线程数（正整数）"
+        return Workflow(
+            elements,
+            loop_count=self._entry_value(self.loop_count_entry, int, "请输入有效的循环次数（正整数）"),
+            interval=self._entry_value(self.interval_entry, float, "请输入有效的元素间间隔（非负数）"),
+            button_interval=self._entry_value(self.button_interval_entry, float, "请输入有效的按钮间间隔（非负数）"),
+            click_delay=self._entry_value(self.click_delay_entry, float,
+                                          "请输入有效的点击后延迟（非负数，毫秒）") / 1000,
+            schedule_policy=SCHEDULE_POLICIES[self.schedule_policy_var.get()],
+            pipeline_mode=self.pipeline_mode_var.get(),
+            x_offset=x_offset,
+            y_offset=y_offset,
+            stop_coords=self.stop_condition["coords"] if self.stop_condition["is_set"] else None,
+            stop_text=self.stop_text_entry.get().strip(),
+            text_fields=[f.strip() for f in self.ocr_fields_entry.get().split(',') if f.strip()],
+            bbox_fields=[f.strip() for f in self.bbox_fields_entry.get().split(',') if f.strip()],
+            ocr_batch_size=self._entry_value(self.ocr_batch_entry, int, "请输入有效的OCR批大小（正整数）"),
+            observation_max_age=self._entry_value(self.observation_age_entry, float,
+                                                  "请输入有效的识别结果有效期（非负数，毫秒）") / 1000,
+            stop_watch_period=self._entry_value(self.stop_watch_entry, float,
+                                                "请输入有效的停止检测周期（非负数，毫秒；0为同步校验）") / 1000,
+            ocr_worker_count=self._entry_value(self.ocr_workers_entry, int, worker_message),
+            ocr_worker_threads=self._entry_value(self.ocr_threads_entry, int, worker_message),
+            template_prefilter=self.template_prefilter_var.get(),
+            debug_ocr_files=self.debug_ocr_files_var.get()
+        )
 
-    # ------------------------------ 处理识别区域（实时识别） ------------------------------
-    def process_region(self, elem):
-        data = elem["data"]
-        target_text = data["target_entry"].get().strip()
-        if not target_text:
-            self.root.after(0, lambda data=data: data["status_var"].set("跳过：未设置目标匹配文本"))
+    def run_sequentially(self):
+        if self.is_running:
+            messagebox.showinfo("提示", "已有任务在运行中")
             return
 
-        if not data["coords"]:
-            self.root.after(0, lambda data=data: data["status_var"].set("跳过：区域未配置"))
+        # OCR引擎常驻，已加载时不会重复加载模型
+        if not self.init_ocr_engine():
+            messagebox.showerror("初始化失败", "OCR引擎未初始化")
             return
 
-        # 实时OCR处理 - 预初始化所有变量
-        json_path = None
-        temp_img = None
-        temp_files = []  # 预先创建临时文件列表
-        
+        # 验证输入
         try:
-            # 使用常驻的region_ocr_pipeline，确保仅在需要时初始化（延迟初始化策略）
-            if self.region_ocr_pipeline is None or not hasattr(self.region_ocr_pipeline, 'predict'):
-                self.root.after(0, lambda data=data: data["status_var"].set("正在初始化OCR管道..."))
-                if not self.init_region_ocr_pipeline():
-                    self.root.after(0, lambda data=data: data["status_var"].set("OCR管道初始化失败"))
-                    return
-            
-            x1, y1, w, h = data["coords"]
-            x2, y2 = x1 + w, y1 + h
-
-            # 生成唯一临时文件名（避免多轮循环文件冲突）
-            timestamp = int(time.time() * 1000000)  # 精确到微秒
-            temp_img = os.path.join(output_dir, f"region_current_{data['current_id']}_{timestamp}.png")
-            temp_files.append(temp_img)  # 立即添加到清理列表
-
-            # 确保截图成功
-            try:
-                current_screenshot = ImageGrab.grab(bbox=(x1, y1, x2, y2))
-                current_screenshot.save(temp_img)
-                if not os.path.exists(temp_img):
-                    raise Exception(f"截图文件未生成：{temp_img}")
-            except Exception as img_err:
-                error_msg = f"区域截图失败：{type(img_err).__name__}: {str(img_err)}"
-                self.root.after(0, lambda data=data, msg=error_msg: data["status_var"].set(msg))
-                return
-
-            # 执行OCR识别
-            try:
-                if self.region_ocr_pipeline is None:
-                    raise Exception("OCR管道未初始化")
-                
-                output = list(self.region_ocr_pipeline.predict([temp_img]))
-                if not output:
-                    self.root.after(0, lambda data=data: data["status_var"].set("OCR识别无结果"))
-                    return
-            except Exception as ocr_err:
-                error_msg = f"OCR识别失败：{type(ocr_err).__name__}: {str(ocr_err)}"
-                self.root.after(0, lambda data=data, msg=error_msg: data["status_var"].set(msg))
-                # 仅在发生错误时考虑重新初始化pipeline
-                if isinstance(ocr_err, (AttributeError, RuntimeError)) and 'NoneType' in str(ocr_err):
-                    self.destroy_region_ocr_pipeline()
-                return
+            workflow = self.collect_workflow()
+            workflow.validate()
+        except ValueError as err:
+            messagebox.showerror("输入错误", str(err))
+            return
 
-            # 保存并解析结果 - 使用JSON文件方式确保数据完整性
-            json_path = f"{os.path.splitext(temp_img)[0]}_res.json"
-            temp_files.append(json_path)  # 添加到清理列表
-            
-            try:
-                output[0].save_to_json(json_path)
-                # 增加文件写入完成确认
-                for _ in range(3):  # 最多尝试3次
-                    if os.path.exists(json_path) and os.path.getsize(json_path) > 0:
-                        break
-                    time.sleep(0.05)
-
-                if not os.path.exists(json_path):
-                    raise Exception(f"OCR结果JSON未生成：{json_path}")
-            except Exception as json_err:
-                error_msg = f"JSON保存失败：{type(json_err).__name__}: {str(json_err)}"
-                self.root.after(0, lambda data=data, msg=error_msg: data["status_var"].set(msg))
-                return
+        self.toggle_buttons_visibility(False)
+        self.execute_btn.config(state=tk.DISABLED)
+        try:
+            self.executor.start(workflow)
+        except Exception as err:
+            self.execute_btn.config(state=tk.NORMAL)
+            self.toggle_buttons_visibility(True)
+            messagebox.showerror("启动失败", f"{type(err).__name__}: {str(err)}")
 
-            # 解析OCR数据
-            try:
-                with open(json_path, "r", encoding="utf-8") as f:
-                    ocr_data = json.load(f)
-            except Exception as parse_err:
-                error_msg = f"JSON解析失败：{type(parse_err).__name__}: {str(parse_err)}"
-                self.root.after(0, lambda data=data, msg=error_msg: data["status_var"].set(msg))
-                return
+    def finalize_execution(self, status):
+        """执行结束后恢复界面（在界面线程中调用），status为执行核心返回的结束状态"""
+        try:
+            # 更新UI状态
+            self.execute_btn.config(state=tk.NORMAL)
+            self.toggle_buttons_visibility(True)
 
-            # 获取用户配置的文本和坐标字段
-            user_text_fields = [f.strip() for f in self.ocr_fields_entry.get().split(',') if f.strip()] or \
-                               self.stop_condition["ocr_text_fields"]
-            user_bbox_fields = [f.strip() for f in self.bbox_fields_entry.get().split(',') if f.strip()] or \
-                               self.stop_condition["ocr_bbox_fields"]
-
-            # 提取所有文本
-            all_texts = []
-            for text_field in user_text_fields:
-                texts = self.get_nested_value(ocr_data, text_field)
-                if texts is None:
-                    continue
-                if isinstance(texts, list):
-                    all_texts = [str(t).strip() for t in texts if str(t).strip()]
-                elif isinstance(texts, str):
-                    all_texts = [texts.strip()]
-                break
+            # 检查是否是正常完成还是被中断；出错时保留错误提示
+            if status == "completed":
+                self.status_var.set("所有循环已成功完成")
+            elif status == "stopped":
+                self.status_var.set("循环已成功中断")
+            self.stage_var.set(self.stage_stats.summary())
+        except Exception as e:
+            self.status_var.set(f"资源清理过程中发生错误: {str(e)}")
 
-            if not all_texts:
-                self.root.after(0, lambda data=data: data["status_var"].set("未识别到任何文本（检查文本字段配置）"))
+    def set_element_status(self, current_id, text):
+        """更新指定ID元素的状态文本（在界面线程中调用）"""
+        for elem in self.elements:
+            if elem["data"]["current_id"] == current_id:
+                elem["data"]["status_var"].set(text)
                 return
 
-            # 提取所有坐标
-            all_bboxes = []
-            for bbox_field in user_bbox_fields:
-                bboxes = self.get_nested_value(ocr_data, bbox_field)
-                if bboxes is None:
-                    continue
-                if isinstance(bboxes, list):
-                    valid_bboxes = []
-                    for b in bboxes:
-                        if isinstance(b, list) and len(b) == 4 and all(isinstance(num, (int, float)) for num in b):
-                            valid_bboxes.append(b)
-                    all_bboxes = valid_bboxes
-                break
-
-            # 使用全局normalize函数，避免重复定义
-            # 注意：确保在文件顶部已定义全局normalize函数
-
-            target_norm = normalize(target_text)
-            matched_text = None
-            matched_bbox = None
-
-            # 匹配文本并关联坐标
-            for i, text in enumerate(all_texts):
-                if normalize(text) == target_norm:
-                    matched_text = text
-                    if i < len(all_bboxes):
-                        matched_bbox = all_bboxes[i]
-                    break
-
-            # 处理匹配结果
-            if matched_text:
-                if matched_bbox:
-                    # 计算屏幕坐标
-                    try:
-                        region_x1, region_y1, _, _ = data["coords"]
-                        text_x1, text_y1, text_x2, text_y2 = map(float, matched_bbox)
-                        screen_click_x = region_x1 + (text_x1 + text_x2) / 2
-                        screen_click_y = region_y1 + (text_y1 + text_y2) / 2
-                        # 执行点击
-                        pyautogui.click(int(screen_click_x), int(screen_click_y))
-                        result_msg = f"匹配成功并点击：{matched_text} = {target_text}（坐标：{int(screen_click_x)},{int(screen_click_y)}）"
-                        self.root.after(0, lambda data=data, msg=result_msg: data["status_var"].set(msg))
-                    except Exception as click_err:
-                        error_msg = f"点击执行失败：{type(click_err).__name__}: {str(click_err)}"
-                        self.root.after(0, lambda data=data, msg=error_msg: data["status_var"].set(msg))
-                else:
-                    self.root.after(0, lambda data=data, mt=matched_text, tt=target_text: 
-                                    data["status_var"].set(f"匹配成功但无坐标：{mt} = {tt}（检查坐标字段配置）"))
-            else:
-                self.root.after(0, lambda data=data, at=str(all_texts), tt=target_text: 
-                                data["status_var"].set(f"匹配失败：识别到{at} ≠ {tt}"))
+    # ------------------------------ 导出执行配置 ------------------------------
+    def export_workflow(self):
+        """把当前元素与执行参数导出为JSON，供命令行无界面执行（python ldq.py --config 文件）"""
+        try:
+            workflow = self.collect_workflow()
+            workflow.validate()
+        except ValueError as err:
+            messagebox.showerror("输入错误", str(err))
+            return
 
+        path = filedialog.asksaveasfilename(
+            title="导出配置", defaultextension=".json", initialfile="workflow.json",
+            filetypes=[("JSON配置", "*.json")]
+        )
+        if not path:
+            return
+        try:
+            workflow.save(path)
         except Exception as err:
-            error_type = type(err).__name__
-            error_message = f"{error_type}: {str(err)}"
-            print(f"process_button异常：{error_message}")
-            if "status_var" in data:
-                self.root.after(0, lambda data=data, msg=error_message: data["status_var"].set(f"处理失败：{msg}"))
-        finally:
-            # 安全清理临时文件 - 无论执行路径如何都确保清理
-            for f in temp_files:
-                if f and isinstance(f, str) and os.path.exists(f):
-                    try:
-                        os.remove(f)
-                    except Exception:
-                        # 静默忽略清理失败，避免干扰主流程
-                        pass
-            # 清空临时文件列表
-            temp_files.clear()
-
-    # ------------------------------ 处理按钮点击 ------------------------------
-    def process_button(self, elem):
-        data = elem["data"]
-
+            messagebox.showerror("导出失败", f"配置导出失败：{str(err)}")
+            return
+        self.status_var.set(f"配置已导出：{path}（可用 python ldq.py --config 无界面执行）")
+
+
+# ------------------------------ 命令行入口 ------------------------------
+def run_headless(args):
+    """无界面执行：加载配置后在后台线程中执行，Ctrl+C停止；返回进程退出码"""
+    try:
+        workflow = Workflow.load(args.config)
+        if args.loops is not None:
+            workflow.loop_count = args.loops
+        workflow.validate()
+    except (OSError, ValueError) as err:
+        print(f"配置错误：{str(err)}", file=sys.stderr)
+        return 2
+
+    try:
+        capture_backend = ReplayCaptureBackend(args.replay) if args.replay else None
+    except (OSError, ValueError) as err:
+        print(f"回放目录错误：{str(err)}", file=sys.stderr)
+        return 2
+    input_backend = RecordingInputBackend() if args.dry_run else None
+    try:
+        executor = Executor(ConsoleReporter(verbose=not args.quiet), capture_backend, input_backend)
+    except Exception as err:
+        # 无图形界面等环境下没有可用的输入后端，可加--dry-run只记录点击
+        print(f"后端初始化失败：{type(err).__name__}: {str(err)}", file=sys.stderr)
+        return 2
+    print(capture_summary(executor.capture_backend.name, executor.capture_report))
+    try:
         try:
-            # 添加属性存在检查，避免AttributeError
-            x_offset = int(self.x_offset_entry.get()) if hasattr(self, 'x_offset_entry') and hasattr(self.x_offset_entry, 'get') else 0
-            y_offset = int(self.y_offset_entry.get()) if hasattr(self, 'y_offset_entry') and hasattr(self.y_offset_entry, 'get') else 0
-        except ValueError:
-            x_offset = 0
-            y_offset = 0
-
-        click_x = data["x"] + data["width"] // 2 + x_offset
-        click_y = data["y"] + data["height"] // 2 + y_offset
-
-        # 恢复异常处理，确保点击失败不会导致程序崩溃
+            thread = executor.start(workflow)
+        except Exception as err:
+            print(f"启动失败：{type(err).__name__}: {str(err)}", file=sys.stderr)
+            return 1
         try:
-            pyautogui.click(click_x, click_y)
-            self.root.after(0, lambda data=data, x=click_x, y=click_y: data["status_var"].set(f"已点击：({x}, {y})"))
-        except Exception as click_err:
-            error_msg = f"点击执行失败：{type(click_err).__name__}: {str(click_err)}"
-            print(f"process_button点击异常：{error_msg}")
-            if "status_var" in data:
-                self.root.after(0, lambda data=data, msg=error_msg: data["status_var"].set(msg))
+            while thread.is_alive():
+                thread.join(0.2)
+        except KeyboardInterrupt:
+            print("收到中断，正在停止...")
+            executor.run_control.stop()
+            thread.join()
+
+        print(executor.stage_stats.summary())
+        if args.dry_run:
+            print(f"记录点击 {len(executor.input_backend.events)} 次（未实际点击）")
+        return 1 if executor.last_status == "error" else 0
+    finally:
+        executor.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="文曲星连点器：不带参数时打开窗口，指定--config时在命令行中无界面执行")
+    parser.add_argument("--config", help="工作流配置JSON（可在窗口中点击“导出配置”生成）")
+    parser.add_argument("--loops", type=int, help="覆盖配置中的循环次数")
+    parser.add_argument("--replay", help="以截图目录回放代替真实屏幕（按文件名顺序）")
+    parser.add_argument("--dry-run", action="store_true", help="只记录点击坐标，不实际点击")
+    parser.add_argument("--quiet", action="store_true", help="不逐条输出各元素的状态")
+    parser.add_argument("--output", help=f"截图、调试结果与阶段耗时的输出目录（默认 {DEFAULT_OUTPUT_DIR}）")
+    args = parser.parse_args(argv)
+    if args.output:
+        set_output_dir(args.output)
+    enable_dpi_awareness()
+    if args.config:
+        return run_headless(args)
+
+    app = RealTimeControl()
+    app.root.mainloop()
+    return 0
 
 
 if __name__ == "__main__":
-    app = RealTimeControl()
-    app.root.mainloop()
\ No newline at end of file
+    # 打包为exe后多进程OCR工作池需要
+    multiprocessing.freeze_support()
+    sys.exit(main())
\ No newline at end of file